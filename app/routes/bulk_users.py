@@ -224,12 +224,13 @@ def sync_users():
         filter_criteria = data.get('filter_criteria', {"test_users_only": True})
         target = data.get('target', 'load_tester')
         
-        # 同期サービス初期化
-        sync_service = UserSyncService()
-        
         if target == 'load_tester':
-            # Load Testerへの同期実行
-            sync_result = sync_service.sync_bidirectional(filter_criteria)
+            # Load Testerへの同期実行（リクエスト終了時にHTTP接続を解放）
+            sync_service = UserSyncService()
+            try:
+                sync_result = sync_service.sync_bidirectional(filter_criteria)
+            finally:
+                sync_service.close()
             
             response_data = {
                 'success': sync_result.success,
@@ -262,7 +263,10 @@ def get_sync_status():
         batch_id = request.args.get('batch_id')
         
         sync_service = UserSyncService()
-        validation_result = sync_service.validate_sync_integrity(batch_id)
+        try:
+            validation_result = sync_service.validate_sync_integrity(batch_id)
+        finally:
+            sync_service.close()
         
         response_data = {
             'is_valid': validation_result.is_valid,
@@ -290,7 +294,10 @@ def export_users_to_file():
         filter_criteria = data.get('filter_criteria', {"test_users_only": True})
         
         sync_service = UserSyncService()
-        success = sync_service.export_to_json_file(file_path, filter_criteria)
+        try:
+            success = sync_service.export_to_json_file(file_path, filter_criteria)
+        finally:
+            sync_service.close()
         
         if success:
             return jsonify({
@@ -80,13 +80,16 @@ def get_system_health_report():
     """
     try:
         bulk_creator = BulkUserCreator()
-        sync_service = UserSyncService()
         
         # 基本統計情報
         lifecycle_stats = bulk_creator.get_lifecycle_statistics()
         
-        # 同期整合性チェック
-        integrity_result = sync_service.validate_sync_integrity()
+        # 同期整合性チェック（リクエスト終了時にHTTP接続を解放）
+        sync_service = UserSyncService()
+        try:
+            integrity_result = sync_service.validate_sync_integrity()
+        finally:
+            sync_service.close()
         
         # エラー統計
         error_report = error_handler.generate_error_report(
@@ -155,7 +158,6 @@ def get_batch_error_analysis(batch_id: str):
     """
     try:
         bulk_creator = BulkUserCreator()
-        sync_service = UserSyncService()
         
         # バッチ情報取得
         batch_info = bulk_creator.get_batch_info(batch_id)
@@ -166,8 +168,12 @@ def get_batch_error_analysis(batch_id: str):
                 'error': f'バッチ {batch_id} が見つかりません'
             }), 404
         
-        # バッチ固有の整合性チェック
-        integrity_result = sync_service.validate_sync_integrity(batch_id)
+        # バッチ固有の整合性チェック（リクエスト終了時にHTTP接続を解放）
+        sync_service = UserSyncService()
+        try:
+            integrity_result = sync_service.validate_sync_integrity(batch_id)
+        finally:
+            sync_service.close()
         
         # クリーンアップレポート生成
         cleanup_report = bulk_creator.generate_cleanup_report(batch_id)
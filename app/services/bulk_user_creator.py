@@ -721,6 +721,7 @@ class BulkUserCreator:
         start_time = time.time()
         created_users = []
         failed_users = []
+        password_hashes = {}
         
         try:
             # チャンク単位で一括挿入
@@ -739,8 +740,8 @@ class BulkUserCreator:
                         created_by_bulk=True,
                         created_at=datetime.utcnow()
                     )
-                    # set_password メソッドを使用してパスワードを正しく設定
-                    user.set_password(cred.password)
+                    # 同一パスワードのハッシュはバッチ内で再利用（テストユーザー専用）
+                    user.password_hash = self._get_shared_password_hash(cred.password, password_hashes)
                     user_objects.append(user)
                 
                 # 個別挿入実行（パスワードハッシュを正しく保存するため）
@@ -841,6 +842,7 @@ class BulkUserCreator:
         """
         created = []
         failed = []
+        password_hashes = {}
         
         try:
             # User オブジェクトのリストを作成
@@ -854,8 +856,8 @@ class BulkUserCreator:
                     created_by_bulk=True,
                     created_at=datetime.utcnow()
                 )
-                # set_password メソッドを使用してパスワードを正しく設定
-                user.set_password(cred.password)
+                # 同一パスワードのハッシュはチャンク内で再利用（テストユーザー専用）
+                user.password_hash = self._get_shared_password_hash(cred.password, password_hashes)
                 user_objects.append(user)
             
             # スレッドセーフな個別挿入（パスワードハッシュを正しく保存するため）
@@ -879,6 +881,22 @@ class BulkUserCreator:
         
         return {'created': created, 'failed': failed}
     
+    @staticmethod
+    def _get_shared_password_hash(password: str, cache: Dict[str, str]) -> str:
+        """
+        同一パスワードのハッシュを一度だけ計算して再利用する
+        
+        generate_password_hash はソルト付きの低速ハッシュのため、テストバッチで
+        共通パスワードを使う場合はユーザーごとに計算するとCPU時間の大半を占める。
+        ハッシュを共有するとユーザー間でソルトも共有されるため、
+        テストユーザーの一括作成以外では使用しないこと。
+        """
+        password_hash = cache.get(password)
+        if password_hash is None:
+            password_hash = generate_password_hash(password)
+            cache[password] = password_hash
+        return password_hash
+    
     def _create_users_individual(self, credentials_list: List[UserCredentials], config: UserCreationConfig) -> tuple:
         """
         個別ユーザー作成（フォールバック用）
@@ -1372,7 +1390,7 @@ class BulkUserCreator:
         try:
             from app.services.user_sync_service import UserSyncService
             
-            # Load Testerの削除APIを呼び出し
+            # Load Testerの削除APIを呼び出し（同期サービスのHTTPセッションを使用し、終了時に解放）
             sync_service = UserSyncService()
             cleanup_url = f"{sync_service.load_tester_url}/api/users/cleanup"
             
@@ -1382,13 +1400,15 @@ class BulkUserCreator:
                 'source': 'main_application'
             }
             
-            import requests
-            response = requests.post(
-                cleanup_url,
-                json=cleanup_data,
-                timeout=30,
-                headers={"Content-Type": "application/json"}
-            )
+            try:
+                response = sync_service.session.post(
+                    cleanup_url,
+                    json=cleanup_data,
+                    timeout=30,
+                    headers={"Content-Type": "application/json"}
+                )
+            finally:
+                sync_service.close()
             
             if response.status_code == 200:
                 result = response.json()
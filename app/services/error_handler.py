@@ -3,6 +3,7 @@
 要件 1.4, 2.5, 3.4: 部分的成功処理、詳細エラーログ、リトライ機構、データ整合性保持
 """
 import logging
+import random
 import time
 import traceback
 import functools
@@ -98,11 +99,15 @@ class RetryConfig:
     max_delay: float = 60.0
     exponential_backoff: bool = True
     retry_on_exceptions: List[type] = field(default_factory=lambda: [Exception])
+    jitter: float = 0.0  # 遅延に加えるランダム幅の割合（0で無効）
     
     def get_delay(self, attempt: int) -> float:
         """リトライ遅延時間を計算"""
         if self.exponential_backoff:
             delay = self.base_delay * (2 ** attempt)
+            if self.jitter:
+                # 複数クライアントのリトライが同時刻に集中しないよう分散
+                delay *= 1 + random.uniform(0, self.jitter)
             return min(delay, self.max_delay)
         return self.base_delay
 
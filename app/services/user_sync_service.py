@@ -1,18 +1,35 @@
 """
 ユーザー同期サービス - Main ApplicationとLoad Tester間のデータ同期を管理
 """
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field, replace
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import json
+import atexit
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import hashlib
 import gzip
-import io
+import mmap
+import os
+import tempfile
+from collections import deque
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # orjson未導入環境では標準jsonにフォールバック
+    orjson = None
+
+try:
+    import ijson  # C実装のyajl2_cバックエンドがあれば自動的に使用される
+except ImportError:  # ijson未導入環境では大容量ファイルも一括読み込み
+    ijson = None
+
 from app.models.user import User
 from app import db
 from app.services.error_handler import (
@@ -22,8 +39,34 @@ from app.services.error_handler import (
 
 logger = logging.getLogger(__name__)
 
+# 同期用デフォルトパスワード（行ごとの環境変数参照を避けるためロード時に一度だけ取得）
+_DEFAULT_PASSWORD = os.getenv('BULK_USER_DEFAULT_PASSWORD', 'TestPass123')
 
-@dataclass
+# 同期状態ファイルの既定パス（作業ディレクトリに依存しないようアプリケーションルート基準）
+_DEFAULT_SYNC_STATE_FILE = Path(__file__).resolve().parents[2] / 'data' / 'sync_state.json'
+
+# この件数を超えるユーザーのハッシュ計算はプロセスプールで並列化
+_PARALLEL_HASH_THRESHOLD = 50_000
+# 並列ハッシュの分割単位（CPU数に依存せず同じデータから同じハッシュを得るため固定）
+_HASH_CHUNK_SIZE = 10_000
+
+
+def _user_fingerprint(username: str, email: str, test_batch_id: Optional[str]) -> int:
+    """差分検出用のユーザー指紋（非暗号用途の64bitハッシュ）"""
+    key = f"{username}\0{email}\0{test_batch_id or ''}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big')
+
+
+def _hash_user_rows_chunk(rows: List[Tuple[int, str, str, Optional[str]]]) -> bytes:
+    """ソート済みユーザー行の1チャンク分のダイジェストを計算（プロセスプールから呼び出し）"""
+    combined_string = "|".join(
+        f"{user_id}:{username}:{email}:{test_batch_id}"
+        for user_id, username, email, test_batch_id in rows
+    )
+    return hashlib.sha256(combined_string.encode()).digest()
+
+
+@dataclass(slots=True)
 class TestUserData:
     """同期用のテストユーザーデータ"""
     id: int
@@ -51,22 +94,20 @@ class TestUserData:
     @classmethod
     def from_user(cls, user: User, include_password: bool = False) -> 'TestUserData':
         """UserモデルからTestUserDataを作成"""
-        import os
-        default_password = os.getenv('BULK_USER_DEFAULT_PASSWORD', 'TestPass123')
-
+        created_at = user.created_at
         return cls(
             id=user.id,
             username=user.username,
             email=user.email,
-            password=default_password if include_password else "",  # 環境変数から取得したデフォルトパスワード
+            password=_DEFAULT_PASSWORD if include_password else "",  # 環境変数から取得したデフォルトパスワード
             is_test_user=user.is_test_user,
             test_batch_id=user.test_batch_id,
             created_by_bulk=user.created_by_bulk,
-            created_at=user.created_at.isoformat() if user.created_at else None
+            created_at=created_at.isoformat() if created_at else None
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class UserExportData:
     """ユーザーエクスポートデータ"""
     users: List[TestUserData]
@@ -81,6 +122,9 @@ class UserExportData:
     compressed_size: Optional[int] = None
     original_size: Optional[int] = None
     
+    # 転送用のgzip済みJSONボディ（シリアライズ対象外）
+    _compressed_body: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    
     def to_dict(self) -> Dict[str, Any]:
         """辞書形式に変換"""
         return {
@@ -108,7 +152,7 @@ class UserExportData:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SyncResult:
     """同期結果"""
     success: bool
@@ -130,7 +174,7 @@ class SyncResult:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class DifferentialSyncData:
     """差分同期データ"""
     added_users: List[TestUserData] = field(default_factory=list)
@@ -170,6 +214,93 @@ class ValidationResult:
         }
 
 
+def _dumps_json(obj: Any) -> bytes:
+    """JSONバイト列に変換（orjsonがあれば使用）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _loads_json(raw: bytes) -> Any:
+    """JSONバイト列を解析（orjsonがあれば使用）"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _is_gzip_file(path: Path) -> bool:
+    """先頭のマジックバイトでgzipファイルかどうかを判定"""
+    with open(path, 'rb') as f:
+        return f.read(2) == _GZIP_MAGIC
+
+
+def _open_json_file(path: Path):
+    """JSONファイルをバイナリモードで開く（gzip圧縮されていれば透過的に展開）"""
+    if _is_gzip_file(path):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _load_json_file(path: Path) -> Any:
+    """JSONファイルを解析（orjsonがあればmmapしたファイルを直接解析し、全体のコピーを避ける）"""
+    if _is_gzip_file(path):
+        with gzip.open(path, 'rb') as f:
+            return _loads_json(f.read())
+    if orjson is None or path.stat().st_size == 0:
+        return _loads_json(path.read_bytes())
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # memoryviewはmmapのクローズ前に解放する必要がある
+        with memoryview(mm) as view:
+            return orjson.loads(view)
+
+
+# ファイルから逐次インポートする際にusers以外で引き継ぐトップレベル項目
+_EXPORT_HEADER_FIELDS = ("export_timestamp", "source_system", "total_count")
+
+
+def _read_export_header(path: Path) -> Dict[str, Any]:
+    """
+    エクスポートファイルの先頭にあるusers以外のトップレベル項目を読み込む
+    
+    usersに到達した時点で解析を打ち切るため、ファイル全体は読まない
+    （usersが先頭にある旧形式のファイルでは空の辞書を返す）
+    """
+    header = {}
+    builder = None
+    with _open_json_file(path) as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == "metadata" and event == "end_map":
+                    header["metadata"] = builder.value
+                    builder = None
+            elif prefix == "users":
+                break
+            elif prefix == "metadata" and event == "start_map":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif prefix in _EXPORT_HEADER_FIELDS:
+                header[prefix] = value
+    return header
+
+
+def _serialize_user_list(users: List[TestUserData]) -> bytes:
+    """ユーザー一覧をJSON配列のバイト列に変換（orjsonがあればdataclassを直接シリアライズ）"""
+    if orjson is not None:
+        return orjson.dumps(users)
+    return json.dumps([user.to_dict() for user in users], ensure_ascii=False).encode('utf-8')
+
+
+def _serialize_export_data(export_data: UserExportData) -> bytes:
+    """エクスポートデータをJSONバイト列に変換（orjsonがあればdataclassを直接シリアライズ）"""
+    if orjson is not None:
+        return orjson.dumps(export_data)
+    return json.dumps(export_data.to_dict(), ensure_ascii=False).encode('utf-8')
+
+
 class UserSyncService:
     """
     Main ApplicationとLoad Tester間でのユーザーデータ同期を管理するサービス
@@ -181,16 +312,39 @@ class UserSyncService:
         self.max_retries = 3
         self.error_handler = BulkUserErrorHandler()
         
+        # JSONファイルエクスポートの遅延書き込み（export_to_json_file(defer=True) 用）
+        self.export_flush_interval = 5.0  # 秒
+        self._pending_export = None
+        self._last_export_flush = time.monotonic()
+        self._flush_registered = False
+        
+        # HTTPコネクションプール（リトライや複数回の呼び出しで接続を再利用）
+        # リトライはバックオフ制御のため error_handler 側で行う
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
         # パフォーマンス最適化設定
         self.differential_sync_enabled = True
         self.compression_enabled = True
         self.compression_threshold = 1024  # 1KB以上で圧縮
+        self.compression_level = 1  # 速度優先のgzip圧縮レベル
         self.memory_efficient_mode = True
         self.batch_size = 100  # メモリ効率的なバッチサイズ
+        self.streaming_import_threshold = 50 * 1024 * 1024  # 50MB以上のファイルは逐次解析
+        self.import_chunk_size = 1000  # 逐次インポート時の1リクエストあたりのユーザー数
         
-        # 同期状態管理
+        # 同期状態管理（前回ハッシュとユーザー指紋は再起動後も差分同期を継続できるようファイルに永続化）
+        # 状態ファイルは最適化版エクスポートの初回呼び出し時に読み込む
+        self.sync_state_file = Path(os.getenv('USER_SYNC_STATE_FILE', _DEFAULT_SYNC_STATE_FILE))
+        self.full_sync_interval = 10  # 差分同期がこの回数続いたらフル同期で取りこぼしを回復
         self._last_sync_hash = None
+        self._differential_sync_count = 0
         self._sync_cache = {}
+        self._sync_state_loaded = False
+        # エクスポート済みでLoad Testerへのインポート成功を待っている同期状態
+        self._pending_sync_state = None
         
         # リトライ設定
         self.network_retry_config = RetryConfig(
@@ -198,7 +352,8 @@ class UserSyncService:
             base_delay=2.0,
             max_delay=30.0,
             exponential_backoff=True,
-            retry_on_exceptions=[requests.exceptions.RequestException, requests.exceptions.Timeout]
+            retry_on_exceptions=[requests.exceptions.RequestException, requests.exceptions.Timeout],
+            jitter=0.5
         )
         
         self.db_retry_config = RetryConfig(
@@ -207,6 +362,10 @@ class UserSyncService:
             exponential_backoff=True
         )
         
+    def close(self):
+        """HTTPセッションを閉じてプールされた接続を解放"""
+        self.session.close()
+    
     def export_users_from_app_optimized(self, filter_criteria: Dict[str, Any] = None, enable_differential: bool = True) -> UserExportData:
         """
         パフォーマンス最適化版のユーザーデータエクスポート
@@ -228,8 +387,17 @@ class UserSyncService:
             if filter_criteria is None:
                 filter_criteria = {"test_users_only": True}
             
-            # 差分同期が有効で前回のハッシュがある場合
-            if enable_differential and self.differential_sync_enabled and self._last_sync_hash:
+            if not self._sync_state_loaded:
+                self._load_sync_state()
+            
+            # 差分同期が有効で前回のハッシュと比較元のユーザー指紋がある場合
+            # （指紋がなければ削除を検出できないためフル同期する）
+            if (enable_differential and self.differential_sync_enabled and self._last_sync_hash
+                    and self._sync_cache.get("last_users")):
+                # 定期的にフル同期を挟み、差分同期で失われた更新を回復（変更なしの回も数える）
+                if self._differential_sync_count >= self.full_sync_interval:
+                    logger.info(f"差分同期が{self._differential_sync_count}回続いたため定期フル同期を実行")
+                    return self._export_full_data(filter_criteria)
                 return self._export_differential_data(filter_criteria)
             else:
                 return self._export_full_data(filter_criteria)
@@ -306,47 +474,46 @@ class UserSyncService:
         start_time = time.time()
         
         # クエリ構築
-        query = User.query
-        
-        # テストユーザーのみフィルタ
-        if filter_criteria.get("test_users_only", True):
-            query = query.filter(User.is_test_user == True)
+        query = self._build_filtered_query(filter_criteria)
         
-        # バッチIDフィルタ
-        batch_id = filter_criteria.get("batch_id")
-        if batch_id:
-            query = query.filter(User.test_batch_id == batch_id)
-        
-        # 一括作成ユーザーのみフィルタ
-        if filter_criteria.get("bulk_users_only", False):
-            query = query.filter(User.created_by_bulk == True)
-        
-        # メモリ効率的なバッチ処理
-        test_users = []
-        total_count = query.count()
-        
-        if self.memory_efficient_mode and total_count > self.batch_size:
-            # 大量データの場合はバッチ処理
-            for offset in range(0, total_count, self.batch_size):
-                batch_users = query.offset(offset).limit(self.batch_size).all()
-                for user in batch_users:
-                    test_user = TestUserData.from_user(user, include_password=True)
-                    test_users.append(test_user)
-                
-                # メモリ管理
-                if len(test_users) % (self.batch_size * 5) == 0:
-                    import gc
-                    gc.collect()
+        # 件数の事前取得（COUNT）は行わず、1回のクエリで結果を逐次読み込む
+        if self.memory_efficient_mode:
+            # batch_size件ずつストリーミング取得してORMオブジェクトの滞留を防ぐ
+            users = query.order_by(User.id).yield_per(self.batch_size)
         else:
-            # 小量データの場合は一括処理
             users = query.all()
-            for user in users:
-                test_user = TestUserData.from_user(user, include_password=True)
-                test_users.append(test_user)
+        
+        test_users = [TestUserData.from_user(user, include_password=True) for user in users]
         
         # データハッシュ計算
         data_hash = self._calculate_data_hash(test_users)
         
+        # 次回の差分計算用のユーザー指紋（インポート成功後に確定する）
+        self._pending_sync_state = {
+            "last_sync_hash": data_hash,
+            "differential_sync_count": 0,
+            "last_users": {
+                user.id: _user_fingerprint(user.username, user.email, user.test_batch_id)
+                for user in test_users
+            }
+        }
+        
+        # コールドスタート時はLoad Testerのハッシュと照合し、一致すれば転送を省略
+        if self._last_sync_hash is None and self._fetch_load_tester_hash() == data_hash:
+            logger.info("Load Testerのデータハッシュが一致するためフル同期をスキップ")
+            return UserExportData(
+                users=[],
+                export_timestamp=datetime.utcnow().isoformat(),
+                source_system="main_application",
+                total_count=0,
+                metadata={
+                    "sync_type": "no_changes",
+                    "last_sync_hash": data_hash,
+                    "current_hash": data_hash
+                },
+                data_hash=data_hash
+            )
+        
         # エクスポートデータ作成
         export_data = UserExportData(
             users=test_users,
@@ -357,7 +524,7 @@ class UserSyncService:
                 "filter_criteria": filter_criteria,
                 "export_duration": time.time() - start_time,
                 "memory_efficient_mode": self.memory_efficient_mode,
-                "batch_processing": total_count > self.batch_size
+                "batch_processing": self.memory_efficient_mode and len(test_users) > self.batch_size
             },
             data_hash=data_hash
         )
@@ -366,9 +533,6 @@ class UserSyncService:
         if self.compression_enabled:
             export_data = self._compress_export_data(export_data)
         
-        # 同期ハッシュを更新
-        self._last_sync_hash = data_hash
-        
         logger.info(f"フルデータエクスポート完了: {len(test_users)}件, ハッシュ={data_hash[:8]}")
         return export_data
     
@@ -379,9 +543,18 @@ class UserSyncService:
         """
         start_time = time.time()
         
-        # 現在のデータハッシュを計算
-        current_users = self._get_filtered_users(filter_criteria)
-        current_hash = self._calculate_data_hash(current_users)
+        # 現在のデータハッシュを計算（取得した行は差分計算でも再利用）
+        current_rows = self._get_filtered_user_rows(filter_criteria)
+        current_hash = self._calculate_rows_hash(current_rows)
+        current_state = self._fingerprint_rows(current_rows)
+        
+        # 次回の比較元となる状態（インポート成功後に確定する）
+        # 変更なしの回も定期フル同期までの回数に含める
+        self._pending_sync_state = {
+            "last_sync_hash": current_hash,
+            "differential_sync_count": self._differential_sync_count + 1,
+            "last_users": current_state
+        }
         
         # ハッシュが同じ場合は変更なし
         if current_hash == self._last_sync_hash:
@@ -400,7 +573,7 @@ class UserSyncService:
             )
         
         # 差分データを計算
-        differential_data = self._calculate_differential_changes(filter_criteria)
+        differential_data = self._calculate_differential_changes(current_rows, current_hash, current_state)
         
         # 差分データをUserExportData形式に変換
         all_changed_users = (
@@ -430,9 +603,6 @@ class UserSyncService:
         if self.compression_enabled:
             export_data = self._compress_export_data(export_data)
         
-        # 同期ハッシュを更新
-        self._last_sync_hash = current_hash
-        
         logger.info(
             f"差分データエクスポート完了: 追加={len(differential_data.added_users)}, "
             f"更新={len(differential_data.updated_users)}, 削除={len(differential_data.deleted_user_ids)}"
@@ -440,8 +610,60 @@ class UserSyncService:
         
         return export_data
     
-    def _get_filtered_users(self, filter_criteria: Dict[str, Any]) -> List[TestUserData]:
-        """フィルタ条件に基づいてユーザーを取得"""
+    def _load_sync_state(self):
+        """永続化された同期状態を読み込み"""
+        self._sync_state_loaded = True
+        try:
+            if self.sync_state_file.exists():
+                state = _loads_json(self.sync_state_file.read_bytes())
+                self._last_sync_hash = state.get("last_sync_hash")
+                self._differential_sync_count = state.get("differential_sync_count", 0)
+                # JSONのキーは文字列になるためユーザーIDを整数に戻す
+                last_users = state.get("last_users")
+                if last_users:
+                    self._sync_cache["last_users"] = {
+                        int(user_id): fingerprint for user_id, fingerprint in last_users.items()
+                    }
+        except Exception as e:
+            logger.warning(f"同期状態の読み込みエラー: {str(e)}")
+    
+    def _save_sync_state(self):
+        """同期状態を永続化（一時ファイル経由で置き換え）"""
+        try:
+            self.sync_state_file.parent.mkdir(parents=True, exist_ok=True)
+            # 同時に保存する他のリクエストと一時ファイルが衝突しないよう一意な名前で作成
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.sync_state_file.parent, prefix=f".{self.sync_state_file.name}.", suffix=".tmp"
+            )
+            try:
+                # 差分計算の比較元となるユーザー指紋もハッシュと一緒に保存する
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(_dumps_json({
+                        "last_sync_hash": self._last_sync_hash,
+                        "differential_sync_count": self._differential_sync_count,
+                        "last_users": self._sync_cache.get("last_users", {}),
+                        "updated_at": datetime.utcnow().isoformat()
+                    }))
+                os.replace(tmp_path, self.sync_state_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            logger.warning(f"同期状態の保存エラー: {str(e)}")
+    
+    def _fetch_load_tester_hash(self) -> Optional[str]:
+        """Load Testerが最後に取り込んだデータのハッシュを取得"""
+        try:
+            status_url = f"{self.load_tester_url}/api/users/sync-status"
+            response = self.session.get(status_url, timeout=5)
+            if response.status_code == 200:
+                return response.json().get("data_hash")
+        except Exception as e:
+            logger.debug(f"Load Testerハッシュ取得エラー: {str(e)}")
+        return None
+    
+    def _build_filtered_query(self, filter_criteria: Dict[str, Any]):
+        """フィルタ条件に基づくユーザークエリを構築"""
         query = User.query
         
         if filter_criteria.get("test_users_only", True):
@@ -454,85 +676,147 @@ class UserSyncService:
         if filter_criteria.get("bulk_users_only", False):
             query = query.filter(User.created_by_bulk == True)
         
-        users = query.all()
-        return [TestUserData.from_user(user, include_password=True) for user in users]
+        return query
+    
+    def _get_filtered_user_rows(self, filter_criteria: Dict[str, Any]) -> List[Tuple[int, str, str, Optional[str]]]:
+        """ハッシュ・差分計算に必要な列 (id, username, email, test_batch_id) のみ取得"""
+        query = self._build_filtered_query(filter_criteria)
+        return query.with_entities(User.id, User.username, User.email, User.test_batch_id).all()
+    
+    def _get_users_by_ids(self, user_ids: List[int]) -> Dict[int, TestUserData]:
+        """指定IDのユーザーのみ読み込んでTestUserDataに変換"""
+        users_by_id = {}
+        chunk_size = self.batch_size * 10
+        for offset in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[offset:offset + chunk_size]
+            for user in User.query.filter(User.id.in_(chunk)).all():
+                users_by_id[user.id] = TestUserData.from_user(user, include_password=True)
+        return users_by_id
     
     def _calculate_data_hash(self, users: List[TestUserData]) -> str:
         """ユーザーデータのハッシュを計算"""
+        return self._calculate_rows_hash(
+            (user.id, user.username, user.email, user.test_batch_id) for user in users
+        )
+    
+    def _calculate_rows_hash(self, rows) -> str:
+        """(id, username, email, test_batch_id) 行のハッシュを計算"""
+        sorted_rows = sorted(rows, key=lambda r: r[0])
+        
+        # 大量データはチャンク単位で並列にハッシュ計算
+        if len(sorted_rows) > _PARALLEL_HASH_THRESHOLD:
+            return self._calculate_rows_hash_parallel(sorted_rows)
+        
         # ユーザーデータを正規化してハッシュ計算
         user_strings = []
-        for user in sorted(users, key=lambda u: u.id):
-            user_str = f"{user.id}:{user.username}:{user.email}:{user.test_batch_id}"
+        for user_id, username, email, test_batch_id in sorted_rows:
+            user_str = f"{user_id}:{username}:{email}:{test_batch_id}"
             user_strings.append(user_str)
         
         combined_string = "|".join(user_strings)
         return hashlib.sha256(combined_string.encode()).hexdigest()
     
-    def _calculate_differential_changes(self, filter_criteria: Dict[str, Any]) -> DifferentialSyncData:
-        """差分変更を計算"""
-        # 現在のユーザーデータを取得
-        current_users = self._get_filtered_users(filter_criteria)
-        current_user_dict = {user.id: user for user in current_users}
+    def _calculate_rows_hash_parallel(self, sorted_rows: List[Tuple[int, str, str, Optional[str]]]) -> str:
+        """チャンクごとのダイジェストを並列計算し、順序どおり連結したものをハッシュ化"""
+        chunks = [
+            [tuple(row) for row in sorted_rows[offset:offset + _HASH_CHUNK_SIZE]]
+            for offset in range(0, len(sorted_rows), _HASH_CHUNK_SIZE)
+        ]
         
-        # キャッシュされた前回のデータと比較
-        cached_users = self._sync_cache.get("last_users", {})
+        try:
+            max_workers = min(os.cpu_count() or 1, 8)
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                digests = list(executor.map(_hash_user_rows_chunk, chunks))
+        except Exception as e:
+            # プロセスプールが使えない環境では同じ手順を逐次実行（結果のハッシュは同一）
+            logger.warning(f"並列ハッシュ計算エラー、逐次計算にフォールバック: {str(e)}")
+            digests = [_hash_user_rows_chunk(chunk) for chunk in chunks]
+        
+        return hashlib.sha256(b"".join(digests)).hexdigest()
+    
+    def _fingerprint_rows(self, rows: List[Tuple[int, str, str, Optional[str]]]) -> Dict[int, int]:
+        """(id, username, email, test_batch_id) 行からユーザーID -> 指紋の対応を作成"""
+        return {
+            user_id: _user_fingerprint(username, email, test_batch_id)
+            for user_id, username, email, test_batch_id in rows
+        }
+    
+    def _calculate_differential_changes(
+        self,
+        current_rows: List[Tuple[int, str, str, Optional[str]]],
+        current_hash: Optional[str] = None,
+        current_state: Optional[Dict[int, int]] = None
+    ) -> DifferentialSyncData:
+        """取得済みの (id, username, email, test_batch_id) 行から差分変更を計算"""
+        if current_state is None:
+            current_state = self._fingerprint_rows(current_rows)
+        
+        # キャッシュされた前回の状態（ユーザーID -> 指紋）と比較
+        cached_state = self._sync_cache.get("last_users", {})
         
         # 追加されたユーザー
-        added_users = [
-            user for user_id, user in current_user_dict.items()
-            if user_id not in cached_users
-        ]
+        added_ids = [user_id for user_id in current_state if user_id not in cached_state]
         
         # 更新されたユーザー
-        updated_users = []
-        for user_id, current_user in current_user_dict.items():
-            if user_id in cached_users:
-                cached_user = cached_users[user_id]
-                if self._user_has_changed(current_user, cached_user):
-                    updated_users.append(current_user)
-        
-        # 削除されたユーザー
+        updated_ids = [
+            user_id for user_id, state in current_state.items()
+            if user_id in cached_state and cached_state[user_id] != state
+        ]
+        
+        # 削除されたユーザー（IDのみ送信）
         deleted_user_ids = [
-            user_id for user_id in cached_users.keys()
-            if user_id not in current_user_dict
+            user_id for user_id in cached_state
+            if user_id not in current_state
         ]
         
-        # キャッシュを更新
-        self._sync_cache["last_users"] = current_user_dict
+        # 追加・更新があったユーザーのみ読み込む（削除のみの場合はDBから行を読み込まない）
+        changed_users = self._get_users_by_ids(added_ids + updated_ids)
+        added_users = [changed_users[user_id] for user_id in added_ids if user_id in changed_users]
+        updated_users = [changed_users[user_id] for user_id in updated_ids if user_id in changed_users]
         
         return DifferentialSyncData(
             added_users=added_users,
             updated_users=updated_users,
             deleted_user_ids=deleted_user_ids,
             last_sync_hash=self._last_sync_hash,
-            current_hash=self._calculate_data_hash(current_users)
-        )
-    
-    def _user_has_changed(self, current_user: TestUserData, cached_user: TestUserData) -> bool:
-        """ユーザーデータが変更されたかチェック"""
-        return (
-            current_user.username != cached_user.username or
-            current_user.email != cached_user.email or
-            current_user.test_batch_id != cached_user.test_batch_id
+            current_hash=current_hash or self._calculate_rows_hash(current_rows)
         )
     
     def _compress_export_data(self, export_data: UserExportData) -> UserExportData:
         """エクスポートデータを圧縮"""
         try:
-            # JSON文字列に変換
-            json_data = json.dumps(export_data.to_dict(), ensure_ascii=False)
-            original_size = len(json_data.encode('utf-8'))
+            pieces = self._iter_export_json_pieces(export_data)
             
-            # 圧縮閾値をチェック
-            if original_size < self.compression_threshold:
+            # 圧縮閾値をチェック（閾値に達するまでのシャードだけを先にシリアライズし、
+            # 閾値未満で終わる小さなエクスポートでは圧縮を一切行わない）
+            head_pieces = []
+            head_size = 0
+            for piece in pieces:
+                head_pieces.append(piece)
+                head_size += len(piece)
+                if head_size >= self.compression_threshold:
+                    break
+            else:
                 return export_data
             
-            # gzip圧縮
-            compressed_buffer = io.BytesIO()
-            with gzip.GzipFile(fileobj=compressed_buffer, mode='wb') as gz_file:
-                gz_file.write(json_data.encode('utf-8'))
+            original_size = 0
+            compressed_parts = []
+            
+            # JSONをシャード単位で生成し、前のシャードのgzip圧縮（GILを解放）と次のシャードの
+            # シリアライズを並行させる。各シャードは独立したgzipメンバーとなり、連結した
+            # マルチメンバーgzipを解凍すると元のJSONドキュメント全体になる
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                pending = deque()
+                for piece in chain(head_pieces, pieces):
+                    original_size += len(piece)
+                    pending.append(executor.submit(gzip.compress, piece, self.compression_level))
+                    # 未圧縮シャードを保持しすぎないよう処理中の数を制限
+                    if len(pending) > 2:
+                        compressed_parts.append(pending.popleft().result())
+                compressed_parts.extend(future.result() for future in pending)
             
-            compressed_size = len(compressed_buffer.getvalue())
+            compressed_body = b"".join(compressed_parts)
+            compressed_size = len(compressed_body)
             compression_ratio = compressed_size / original_size
             
             # 圧縮効果がある場合のみ適用
@@ -540,6 +824,7 @@ class UserSyncService:
                 export_data.compression_enabled = True
                 export_data.compressed_size = compressed_size
                 export_data.original_size = original_size
+                export_data._compressed_body = compressed_body
                 
                 logger.debug(
                     f"データ圧縮完了: {original_size} -> {compressed_size} bytes "
@@ -552,6 +837,20 @@ class UserSyncService:
             logger.warning(f"データ圧縮エラー: {str(e)}")
             return export_data
     
+    def _iter_export_json_pieces(self, export_data: UserExportData):
+        """エクスポートデータのJSONを先頭・ユーザーシャード・末尾のバイト列に分けて生成"""
+        shard_size = self.batch_size * 10
+        users = export_data.users
+        
+        # users以外のフィールドは空のusersでシリアライズし、先頭の "users":[] を取り除いて先に出力
+        # （逐次インポート時にusersを読む前にmetadata等を取得できるようにする）
+        envelope = _serialize_export_data(replace(export_data, users=[]))
+        yield b"{" + envelope[envelope.index(b"],") + 2:-1] + b',"users":['
+        for offset in range(0, len(users), shard_size):
+            shard_json = _serialize_user_list(users[offset:offset + shard_size])[1:-1]
+            yield shard_json if offset == 0 else b"," + shard_json
+        yield b"]}"
+    
     @with_error_handling(
         category=ErrorCategory.DATA_SYNC,
         severity=ErrorSeverity.HIGH
@@ -567,14 +866,78 @@ class UserSyncService:
         Returns:
             SyncResult: インポート結果
         """
-        start_time = time.time()
-        errors = []
-        synced_count = 0
-        
         logger.info(f"Load Testerへのインポート開始: {user_data.total_count}件")
         
         # データ整合性チェック
         if not user_data.users:
+            # 差分同期で変更がない場合は正常系としてHTTP送信自体を省略
+            if user_data.metadata.get("sync_type") == "no_changes":
+                logger.info("データに変更がないためLoad Testerへの送信をスキップ")
+                self._commit_pending_sync_state(user_data.data_hash)
+                return SyncResult(
+                    success=True,
+                    synced_count=0,
+                    failed_count=0,
+                    errors=[],
+                    sync_timestamp=datetime.utcnow().isoformat(),
+                    duration=0.0
+                )
+            
+            logger.warning("インポートするユーザーデータが空です")
+            return SyncResult(
+                success=True,
+                synced_count=0,
+                failed_count=0,
+                errors=["インポートするユーザーデータが空です"],
+                sync_timestamp=datetime.utcnow().isoformat(),
+                duration=0.0
+            )
+        
+        # リクエストボディ準備（圧縮済みの場合はgzipバイト列をそのまま転送）
+        if user_data.compression_enabled and user_data._compressed_body is not None:
+            request_body = user_data._compressed_body
+            request_headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        else:
+            request_body = _serialize_export_data(user_data)
+            request_headers = {"Content-Type": "application/json"}
+        
+        sync_result = self._post_import_request(
+            request_body, request_headers, user_data.total_count, user_data.source_system
+        )
+        
+        # Load Testerが受け入れた場合のみ次回の差分同期の比較元を更新
+        if sync_result.success:
+            self._commit_pending_sync_state(user_data.data_hash)
+        
+        return sync_result
+    
+    def _commit_pending_sync_state(self, data_hash: Optional[str]):
+        """インポートが成功したエクスポートの同期状態を確定して永続化"""
+        pending = self._pending_sync_state
+        if pending is None or data_hash is None or pending["last_sync_hash"] != data_hash:
+            return
+        
+        self._last_sync_hash = pending["last_sync_hash"]
+        self._differential_sync_count = pending["differential_sync_count"]
+        self._sync_cache["last_users"] = pending["last_users"]
+        self._pending_sync_state = None
+        self._save_sync_state()
+    
+    def _import_user_dicts(self, users: List[Dict[str, Any]], meta: Dict[str, Any]) -> SyncResult:
+        """
+        解析済みのユーザー辞書をTestUserDataに変換せずLoad Testerにインポート
+        
+        Args:
+            users: ユーザー辞書のリスト
+            meta: export_timestamp・source_system・metadata等のトップレベル項目
+            
+        Returns:
+            SyncResult: インポート結果
+        """
+        total_count = len(users)
+        logger.info(f"Load Testerへのインポート開始: {total_count}件")
+        
+        if not users:
             logger.warning("インポートするユーザーデータが空です")
             return SyncResult(
                 success=True,
@@ -585,19 +948,34 @@ class UserSyncService:
                 duration=0.0
             )
         
+        request_body = _dumps_json({
+            "users": users,
+            "export_timestamp": meta.get("export_timestamp", ""),
+            "source_system": meta.get("source_system", ""),
+            "total_count": total_count,
+            "metadata": meta.get("metadata", {})
+        })
+        return self._post_import_request(
+            request_body, {"Content-Type": "application/json"}, total_count, meta.get("source_system", "")
+        )
+    
+    def _post_import_request(self, request_body: bytes, request_headers: Dict[str, str],
+                             total_count: int, source_system: str) -> SyncResult:
+        """シリアライズ済みのインポートリクエストをリトライ付きでLoad Testerに送信"""
+        start_time = time.time()
+        errors = []
+        synced_count = 0
+        
         # Load TesterのAPIエンドポイントにデータ送信
         import_url = f"{self.load_tester_url}/api/users/import"
         
-        # リクエストデータ準備
-        request_data = user_data.to_dict()
-        
         # リトライ機構付きHTTPリクエスト送信
         def send_import_request():
-            response = requests.post(
+            response = self.session.post(
                 import_url,
-                json=request_data,
+                data=request_body,
                 timeout=self.sync_timeout,
-                headers={"Content-Type": "application/json"}
+                headers=request_headers
             )
             
             if response.status_code == 200:
@@ -621,8 +999,8 @@ class UserSyncService:
                 ErrorCategory.NETWORK,
                 {
                     "url": import_url,
-                    "user_count": user_data.total_count,
-                    "source_system": user_data.source_system
+                    "user_count": total_count,
+                    "source_system": source_system
                 }
             )
             
@@ -647,7 +1025,7 @@ class UserSyncService:
         sync_result = SyncResult(
             success=success,
             synced_count=synced_count,
-            failed_count=user_data.total_count - synced_count,
+            failed_count=total_count - synced_count,
             errors=errors,
             sync_timestamp=datetime.utcnow().isoformat(),
             duration=duration
@@ -727,8 +1105,11 @@ class UserSyncService:
         logger.info(f"データ整合性検証開始: バッチID={batch_id or '全体'}")
         
         # Main Applicationのユーザー取得（リトライ付き）
+        # 整合性チェックに必要な列のみ取得し、ORMオブジェクトの構築を避ける
         def get_main_app_users():
-            query = User.query.filter(User.is_test_user == True)
+            query = User.query.with_entities(User.username, User.test_batch_id).filter(
+                User.is_test_user == True
+            )
             if batch_id:
                 query = query.filter(User.test_batch_id == batch_id)
             return query.all()
@@ -753,7 +1134,7 @@ class UserSyncService:
         # Load Testerの設定取得を試行（リトライ付き）
         def get_load_tester_status():
             status_url = f"{self.load_tester_url}/api/users/sync-status"
-            response = requests.get(status_url, timeout=5)
+            response = self.session.get(status_url, timeout=5)
             
             if response.status_code == 200:
                 return response.json()
@@ -800,11 +1181,11 @@ class UserSyncService:
     
     def _perform_detailed_integrity_check(
         self, 
-        main_app_users: List[User], 
+        main_app_users: List[Tuple[str, Optional[str]]], 
         load_tester_users: List[Dict], 
         batch_id: str = None
     ) -> List[str]:
-        """詳細な整合性チェックを実行"""
+        """詳細な整合性チェックを実行（main_app_usersは(username, test_batch_id)のタプル）"""
         inconsistencies = []
         
         # ユーザー数の比較
@@ -817,7 +1198,7 @@ class UserSyncService:
             )
         
         # ユーザー名の比較
-        main_usernames = {user.username for user in main_app_users}
+        main_usernames = {username for username, _ in main_app_users}
         load_tester_usernames = {user.get("username") for user in load_tester_users}
         
         missing_in_load_tester = main_usernames - load_tester_usernames
@@ -837,53 +1218,94 @@ class UserSyncService:
         
         # バッチIDの整合性チェック
         if batch_id:
-            load_tester_batch_users = [
-                user for user in load_tester_users 
+            load_tester_batch_count = sum(
+                1 for user in load_tester_users
                 if user.get("test_batch_id") == batch_id
-            ]
+            )
             
-            if len(load_tester_batch_users) != main_count:
+            if load_tester_batch_count != main_count:
                 inconsistencies.append(
                     f"バッチ{batch_id}のユーザー数不一致: "
-                    f"Main App={main_count}, Load Tester={len(load_tester_batch_users)}"
+                    f"Main App={main_count}, Load Tester={load_tester_batch_count}"
                 )
         
         return inconsistencies
     
-    def export_to_json_file(self, file_path: str, filter_criteria: Dict[str, Any] = None) -> bool:
+    def export_to_json_file(self, file_path: str, filter_criteria: Dict[str, Any] = None, defer: bool = False) -> bool:
         """
         ユーザーデータをJSONファイルにエクスポート
         
         Args:
-            file_path: 出力ファイルパス
+            file_path: 出力ファイルパス（拡張子が.gzの場合はgzip圧縮して出力）
             filter_criteria: フィルタ条件
+            defer: Trueの場合は書き込みを保留し、export_flush_interval秒ごと
+                   （またはflush_exports()/プロセス終了時）に最新の内容のみ書き出す
             
         Returns:
             bool: エクスポート成功可否
         """
         try:
             export_data = self.export_users_from_app(filter_criteria)
-            
-            # ファイル出力
             output_path = Path(file_path)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data.to_dict(), f, ensure_ascii=False, indent=2)
+            if defer:
+                # 連続呼び出し時は最新のデータのみ保持し、ファイル全体の再書き込みを間引く
+                self._pending_export = (output_path, export_data)
+                if not self._flush_registered:
+                    atexit.register(self.flush_exports)
+                    self._flush_registered = True
+                if time.monotonic() - self._last_export_flush >= self.export_flush_interval:
+                    return self.flush_exports()
+                return True
             
-            logger.info(f"JSONファイルエクスポート完了: {file_path} ({export_data.total_count}件)")
+            self._write_export_file(output_path, export_data)
             return True
             
         except Exception as e:
             logger.error(f"JSONファイルエクスポートエラー: {str(e)}")
             return False
     
+    def flush_exports(self) -> bool:
+        """保留中のJSONファイルエクスポートを書き出す"""
+        pending = self._pending_export
+        if pending is None:
+            return True
+        
+        self._pending_export = None
+        self._last_export_flush = time.monotonic()
+        try:
+            self._write_export_file(*pending)
+            return True
+        except Exception as e:
+            logger.error(f"JSONファイルエクスポートエラー: {str(e)}")
+            return False
+    
+    def _write_export_file(self, output_path: Path, export_data: UserExportData):
+        """エクスポートデータをJSONファイルに書き出す"""
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # ユーザー辞書の一覧を一括生成せず、シャード単位でJSONを書き出す
+        # 1MBのバッファで小さなwrite()をまとめ、書き込み途中で中断しても既存ファイルが壊れないよう一時ファイル経由で置き換え
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        with open(tmp_path, 'wb', buffering=1 << 20) as raw:
+            if output_path.suffix == '.gz':
+                # 拡張子が.gzの場合はgzip圧縮して書き出す（import_from_json_fileは自動判定して展開）
+                with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=self.compression_level) as f:
+                    for piece in self._iter_export_json_pieces(export_data):
+                        f.write(piece)
+            else:
+                for piece in self._iter_export_json_pieces(export_data):
+                    raw.write(piece)
+        os.replace(tmp_path, output_path)
+        
+        logger.info(f"JSONファイルエクスポート完了: {output_path} ({export_data.total_count}件)")
+    
     def import_from_json_file(self, file_path: str) -> SyncResult:
         """
         JSONファイルからユーザーデータをインポート
         
         Args:
-            file_path: 入力ファイルパス
+            file_path: 入力ファイルパス（gzip圧縮ファイルは先頭バイトで判定して展開）
             
         Returns:
             SyncResult: インポート結果
@@ -894,11 +1316,14 @@ class UserSyncService:
             if not input_path.exists():
                 raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
             
-            with open(input_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # 大容量ファイルはユーザーを逐次解析し、チャンク単位でインポート
+            if ijson is not None and input_path.stat().st_size >= self.streaming_import_threshold:
+                return self._import_from_json_file_streaming(input_path)
+            
+            data = _load_json_file(input_path)
             
-            export_data = UserExportData.from_dict(data)
-            return self.import_users_to_load_tester(export_data)
+            # 送信するだけなのでTestUserDataへの変換は行わず、解析結果の辞書をそのまま使用
+            return self._import_user_dicts(data.get("users", []), data)
             
         except Exception as e:
             error_msg = f"JSONファイルインポートエラー: {str(e)}"
@@ -911,4 +1336,51 @@ class UserSyncService:
                 errors=[error_msg],
                 sync_timestamp=datetime.utcnow().isoformat(),
                 duration=0.0
-            )
\ No newline at end of file
+            )
+    
+    def _import_from_json_file_streaming(self, input_path: Path) -> SyncResult:
+        """ijsonでユーザーを逐次読み込み、import_chunk_size件ずつLoad Testerにインポート"""
+        start_time = time.time()
+        
+        # users より前にあるmetadata等のみ先に取得（ファイル全体の二重解析は行わない）
+        header = _read_export_header(input_path)
+        
+        synced_count = 0
+        failed_count = 0
+        errors = []
+        chunk_meta = header
+        
+        def import_chunk(chunk: List[Dict[str, Any]]):
+            nonlocal synced_count, failed_count, chunk_meta
+            result = self._import_user_dicts(chunk, chunk_meta)
+            # 既存ユーザーのクリア指定は最初のチャンクにのみ適用（後続チャンクで先のチャンクを消さない）
+            if chunk_meta.get("metadata", {}).get("clear_existing"):
+                chunk_meta = {**chunk_meta, "metadata": {**chunk_meta["metadata"], "clear_existing": False}}
+            synced_count += result.synced_count
+            failed_count += result.failed_count
+            errors.extend(result.errors)
+        
+        with _open_json_file(input_path) as f:
+            chunk = []
+            for user_data in ijson.items(f, 'users.item', use_float=True):
+                chunk.append(user_data)
+                if len(chunk) >= self.import_chunk_size:
+                    import_chunk(chunk)
+                    chunk = []
+            if chunk:
+                import_chunk(chunk)
+        
+        duration = time.time() - start_time
+        logger.info(
+            f"JSONファイル逐次インポート完了: 成功={synced_count}, 失敗={failed_count} "
+            f"(ファイル記載件数={header.get('total_count')}, {duration:.2f}秒)"
+        )
+        
+        return SyncResult(
+            success=synced_count > 0 and not errors,
+            synced_count=synced_count,
+            failed_count=failed_count,
+            errors=errors,
+            sync_timestamp=datetime.utcnow().isoformat(),
+            duration=duration
+        )
@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
-from app import create_app
+from sqlalchemy import select
+from werkzeug.security import check_password_hash
+
+from app import db
 from app.models import User
+from debug_context import get_app
 
-app = create_app()
-with app.app_context():
-    # デバッグユーザーを確認
-    user = User.query.get(122)
-    if user:
-        print(f'Debug User (ID: 122):')
-        print(f'  Email: {user.email}')
-        print(f'  Username: {user.username}')
-        print(f'  Password check with TestPass123!: {user.check_password("TestPass123!")}')
-        print(f'  Password hash: {user.password_hash[:50]}...')
-    else:
-        print('Debug user not found')
\ No newline at end of file
+get_app()
+# デバッグユーザーを確認（必要な列のみ取得）
+user = db.session.execute(
+    select(User.email, User.username, User.password_hash).where(User.id == 122)
+).first()
+if user:
+    print(f'Debug User (ID: 122):')
+    print(f'  Email: {user.email}')
+    print(f'  Username: {user.username}')
+    print(f'  Password check with TestPass123!: {check_password_hash(user.password_hash, "TestPass123!")}')
+    print(f'  Password hash: {user.password_hash[:50]}...')
+else:
+    print('Debug user not found')
\ No newline at end of file
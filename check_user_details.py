@@ -1,31 +1,52 @@
 #!/usr/bin/env python3
-from app import create_app
+from sqlalchemy import bindparam, select
+from werkzeug.security import check_password_hash
+
+from app import db
 from app.models import User
+from debug_context import get_app
+
+EMAIL_PATTERN = 'testuser_1761554998_%'
+
+# 文の構築はモジュール読み込み時に一度だけ行い、実行時はパターンのみバインドする
+# 表示に必要な列のみ取得し、ORMインスタンスの構築や遅延ロードを避ける
+_USERS_BY_EMAIL_PATTERN = select(
+    User.email,
+    User.username,
+    User.password_hash,
+    User.is_test_user,
+    User.test_batch_id,
+    User.created_by_bulk
+).where(User.email.like(bindparam('pattern')))
 
-app = create_app()
-with app.app_context():
-    # 最新の一括作成ユーザーを取得
-    users = User.query.filter(User.email.like('testuser_1761554998_%')).all()
-    print(f'Found {len(users)} users')
+get_app()
+# 最新の一括作成ユーザーを取得
+users = db.session.execute(_USERS_BY_EMAIL_PATTERN, {'pattern': EMAIL_PATTERN}).all()
+print(f'Found {len(users)} users')
+
+if users:
+    user = users[0]
+    print(f'User: {user.email}')
+    print(f'Username: {user.username}')
+    print(f'Is test user: {user.is_test_user}')
+    print(f'Test batch ID: {user.test_batch_id}')
+    print(f'Created by bulk: {user.created_by_bulk}')
+    
+    # 様々なパスワードでテスト
+    test_passwords = [
+        'TestPass123!',
+        'password123',
+        'testpass',
+        user.username,  # ユーザー名と同じ
+        'defaultpass'
+    ]
     
-    if users:
-        user = users[0]
-        print(f'User: {user.email}')
-        print(f'Username: {user.username}')
-        print(f'Is test user: {user.is_test_user}')
-        print(f'Test batch ID: {user.test_batch_id}')
-        print(f'Created by bulk: {getattr(user, "created_by_bulk", "N/A")}')
-        
-        # 様々なパスワードでテスト
-        test_passwords = [
-            'TestPass123!',
-            'password123',
-            'testpass',
-            user.username,  # ユーザー名と同じ
-            'defaultpass'
-        ]
-        
-        print('\nPassword tests:')
-        for pwd in test_passwords:
-            result = user.check_password(pwd)
-            print(f'  {pwd}: {result}')
\ No newline at end of file
+    # ハッシュ検証は低速なため、一致した時点で残りの候補は検証しない
+    print('\nPassword tests:')
+    for pwd in test_passwords:
+        if check_password_hash(user.password_hash, pwd):
+            print(f'  MATCH: {pwd}')
+            break
+        print(f'  {pwd}: False')
+    else:
+        print('  No matching password')
\ No newline at end of file
@@ -1,32 +1,45 @@
 #!/usr/bin/env python3
 import json
+import os
 import sys
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # orjson未導入環境では標準jsonにフォールバック
+    orjson = None
+
 # Load Testerの設定ファイルから古いユーザーを削除
 config_file = Path("data/config.json")
 
 if config_file.exists():
-    with open(config_file, 'r', encoding='utf-8') as f:
-        config = json.load(f)
-    
+    raw = config_file.read_bytes()
+    config = orjson.loads(raw) if orjson is not None else json.loads(raw)
+
     test_users = config.get("test_users", [])
     print(f"Before cleanup: {len(test_users)} users")
-    
+
     # 新しいバッチのユーザーのみを保持
     new_batch_id = "693d25b1-9c56-4e66-9d70-2f95cfa1eb89"
     filtered_users = [
-        user for user in test_users 
+        user for user in test_users
         if user.get("test_batch_id") == new_batch_id
     ]
-    
+
     print(f"After cleanup: {len(filtered_users)} users")
-    
+
     config["test_users"] = filtered_users
-    
-    with open(config_file, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
-    
+
+    if orjson is not None:
+        payload = orjson.dumps(config, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(config, indent=2, ensure_ascii=False).encode('utf-8')
+
+    # 書き込み途中で中断しても設定ファイルが壊れないよう一時ファイル経由で置き換え
+    tmp_file = config_file.with_suffix('.json.tmp')
+    tmp_file.write_bytes(payload)
+    os.replace(tmp_file, config_file)
+
     print("✅ Cleanup completed")
 else:
-    print("❌ Config file not found")
\ No newline at end of file
+    print("❌ Config file not found")
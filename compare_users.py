@@ -1,23 +1,68 @@
 #!/usr/bin/env python3
-from app import create_app
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import bindparam, select, union_all
+from werkzeug.security import check_password_hash
+
+from app import db
 from app.models import User
+from debug_context import get_app
 
-app = create_app()
-with app.app_context():
-    # 以前成功していたユーザー（修正したもの）
-    old_users = User.query.filter(User.email.like('testuser_1761554998_%')).all()
-    print('=== 以前成功していたユーザー ===')
-    for user in old_users[:2]:
+OLD_EMAIL_PREFIX = 'testuser_1761554998_'
+NEW_EMAIL_PREFIX = 'testuser_1761557665_'
+SAMPLE_SIZE = 2
+TEST_PASSWORD = 'TestPass123!'
+
+
+def _sample_by_prefix(param_name):
+    """メールアドレスの前方一致で表示件数分だけ取得するSELECT（パターンはバインドパラメータ）"""
+    return select(User.email, User.username, User.password_hash).where(
+        User.email.like(bindparam(param_name))
+    ).limit(SAMPLE_SIZE)
+
+
+# 文の構築はモジュール読み込み時に一度だけ行い、実行時はパラメータのみ差し替える
+_SAMPLE_USERS_QUERY = union_all(_sample_by_prefix('old_pattern'), _sample_by_prefix('new_pattern'))
+
+
+def _check_password(password_hash):
+    """プロセスプールから呼び出すためモジュールレベルで定義"""
+    return check_password_hash(password_hash, TEST_PASSWORD)
+
+
+def _print_users(title, users, results):
+    print(title)
+    for user in users:
         print(f'Email: {user.email}')
         print(f'Username: {user.username}')
-        print(f'Password check: {user.check_password("TestPass123!")}')
+        print(f'Password check: {results[user.email]}')
         print()
-    
+
+
+def main():
+    get_app()
+    # 以前成功していたユーザーと現在のユーザーを表示件数分ずつ1回のクエリで取得
+    rows = db.session.execute(_SAMPLE_USERS_QUERY, {
+        'old_pattern': f'{OLD_EMAIL_PREFIX}%',
+        'new_pattern': f'{NEW_EMAIL_PREFIX}%'
+    }).all()
+
+    # パスワードハッシュの検証はCPU負荷が高いため、プロセスを分けて並列に実行
+    results = {}
+    if rows:
+        with ProcessPoolExecutor(max_workers=min(len(rows), os.cpu_count() or 1)) as executor:
+            checks = executor.map(_check_password, [row.password_hash for row in rows])
+            results = {row.email: ok for row, ok in zip(rows, checks)}
+
+    # 以前成功していたユーザー（修正したもの）
+    old_users = [row for row in rows if row.email.startswith(OLD_EMAIL_PREFIX)]
+    _print_users('=== 以前成功していたユーザー ===', old_users, results)
+
     # 現在のユーザー
-    new_users = User.query.filter(User.email.like('testuser_1761557665_%')).all()
-    print('=== 現在のユーザー ===')
-    for user in new_users[:2]:
-        print(f'Email: {user.email}')
-        print(f'Username: {user.username}')
-        print(f'Password check: {user.check_password("TestPass123!")}')
-        print()
\ No newline at end of file
+    new_users = [row for row in rows if row.email.startswith(NEW_EMAIL_PREFIX)]
+    _print_users('=== 現在のユーザー ===', new_users, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 繰り返し呼び出してもTCP接続を再利用できるようセッションを共有
+_SESSION = requests.Session()
+_SESSION.mount('http://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+))
 
 # 小さなテストでユーザー作成
 create_data = {
@@ -20,7 +30,7 @@ print("=== API経由でのユーザー作成デバッグ ===")
 print(f"送信データ: {json.dumps(create_data, indent=2)}")
 
 try:
-    response = requests.post(
+    response = _SESSION.post(
         "http://localhost:5001/api/bulk-users/create",
         json=create_data,
         timeout=30
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+デバッグ用スクリプト共通のアプリケーションコンテキスト
+複数のスクリプトを同一プロセスで実行してもFlaskアプリの生成は1回のみ
+"""
+from functools import lru_cache
+
+from app import create_app
+
+
+@lru_cache(maxsize=1)
+def get_app():
+    """Flaskアプリを生成してアプリケーションコンテキストをプッシュ（初回のみ）"""
+    app = create_app()
+    app.app_context().push()
+    return app
@@ -1,54 +1,62 @@
 #!/usr/bin/env python3
-from app import create_app, db
+from sqlalchemy import insert
+
+from app import db
 from app.models import User
+from debug_context import get_app
 from werkzeug.security import generate_password_hash, check_password_hash
 
-app = create_app()
-with app.app_context():
-    # 手動でユーザーを作成してテスト
-    print("Creating test user manually...")
-    
-    # 1. 直接password_hashを設定
-    user1 = User(
-        username="debug_user1@example.com",
-        email="debug_user1@example.com",
-        password_hash=generate_password_hash("TestPass123!"),
-        is_test_user=True,
-        test_batch_id="debug_batch",
-        created_by_bulk=True
-    )
-    
-    # 2. set_passwordメソッドを使用
-    user2 = User(
-        username="debug_user2@example.com",
-        email="debug_user2@example.com",
-        is_test_user=True,
-        test_batch_id="debug_batch",
-        created_by_bulk=True
-    )
-    user2.set_password("TestPass123!")
-    
-    db.session.add(user1)
-    db.session.add(user2)
-    db.session.commit()
-    
-    print("Testing passwords...")
-    
-    # パスワードテスト
-    print(f"User1 (direct hash): {user1.check_password('TestPass123!')}")
-    print(f"User2 (set_password): {user2.check_password('TestPass123!')}")
-    
-    # ハッシュを比較
-    print(f"User1 hash: {user1.password_hash[:50]}...")
-    print(f"User2 hash: {user2.password_hash[:50]}...")
-    
-    # 手動でハッシュを生成してテスト
-    manual_hash = generate_password_hash("TestPass123!")
-    print(f"Manual hash: {manual_hash[:50]}...")
-    print(f"Manual hash check: {check_password_hash(manual_hash, 'TestPass123!')}")
-    
-    # クリーンアップ
-    db.session.delete(user1)
-    db.session.delete(user2)
-    db.session.commit()
-    print("Cleanup completed")
\ No newline at end of file
+get_app()
+# 手動でユーザーを作成してテスト
+print("Creating test user manually...")
+
+# 1. 直接password_hashを設定
+direct_hash = generate_password_hash("TestPass123!")
+
+# 2. set_passwordメソッドを使用（ハッシュ生成のみ行い、挿入は一括で実施）
+hasher = User()
+hasher.set_password("TestPass123!")
+
+# ORMのunit-of-workを経由せずCoreのINSERTで一括挿入
+db.session.execute(insert(User), [
+    {
+        'username': "debug_user1@example.com",
+        'email': "debug_user1@example.com",
+        'password_hash': direct_hash,
+        'is_test_user': True,
+        'test_batch_id': "debug_batch",
+        'created_by_bulk': True
+    },
+    {
+        'username': "debug_user2@example.com",
+        'email': "debug_user2@example.com",
+        'password_hash': hasher.password_hash,
+        'is_test_user': True,
+        'test_batch_id': "debug_batch",
+        'created_by_bulk': True
+    }
+])
+db.session.commit()
+
+user1 = User.query.filter_by(username="debug_user1@example.com").first()
+user2 = User.query.filter_by(username="debug_user2@example.com").first()
+
+print("Testing passwords...")
+
+# パスワードテスト
+print(f"User1 (direct hash): {user1.check_password('TestPass123!')}")
+print(f"User2 (set_password): {user2.check_password('TestPass123!')}")
+
+# ハッシュを比較
+print(f"User1 hash: {user1.password_hash[:50]}...")
+print(f"User2 hash: {user2.password_hash[:50]}...")
+
+# 手動でハッシュを生成してテスト
+manual_hash = generate_password_hash("TestPass123!")
+print(f"Manual hash: {manual_hash[:50]}...")
+print(f"Manual hash check: {check_password_hash(manual_hash, 'TestPass123!')}")
+
+# クリーンアップ
+User.query.filter_by(test_batch_id="debug_batch").delete(synchronize_session=False)
+db.session.commit()
+print("Cleanup completed")
\ No newline at end of file
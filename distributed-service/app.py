@@ -20,7 +20,6 @@ except Exception as e:
     # 初期化に失敗してもアプリケーションは続行
 
 from flask import Flask, request, jsonify
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 
 # ログ設定とエラーハンドリングをインポート
@@ -48,8 +47,9 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # エラーハンドリング設定
 app.config['PROPAGATE_EXCEPTIONS'] = True
 
-# データベースとマイグレーションの初期化
-db = SQLAlchemy(app)
+# データベースとマイグレーションの初期化（モデルはmodelsモジュールで定義済み）
+from models import db, init_database, check_database_connection
+db.init_app(app)
 migrate = Migrate(app, db)
 
 # エラーハンドラーを登録
@@ -64,14 +64,15 @@ from newrelic_utils import (
     record_custom_event
 )
 
-# モデルを初期化（循環インポートを避けるため）
-from models import create_models, init_database, check_database_connection
-User, Product, Order, OrderItem, CartItem = create_models(db)
-
 # パフォーマンスルートを登録
 from routes.performance import performance_bp
 app.register_blueprint(performance_bp)
 
+@app.before_request
+def set_service_name_attribute():
+    """サービス名はリクエストごとに1回だけトランザクションへ設定"""
+    newrelic.agent.add_custom_attribute('service_name', 'distributed-service')
+
 @app.route('/health', methods=['GET'])
 @newrelic.agent.function_trace()
 def health_check():
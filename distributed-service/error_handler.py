@@ -3,13 +3,16 @@
 データベース接続エラー、HTTP通信エラー、その他のエラーを統合的に処理
 """
 
+import json
 import logging
 import traceback
 import time
+from functools import lru_cache
 from datetime import datetime
-from typing import Dict, Any, Optional, Union
-from flask import jsonify, request
+from typing import Dict, Any, Optional, Tuple
+from flask import has_request_context, jsonify, request
 import newrelic.agent
+from sqlalchemy import text
 from sqlalchemy.exc import (
     SQLAlchemyError, 
     DatabaseError, 
@@ -18,11 +21,137 @@ from sqlalchemy.exc import (
     IntegrityError,
     OperationalError
 )
-import psycopg2
 from requests.exceptions import RequestException, Timeout, ConnectionError
+from werkzeug.exceptions import HTTPException
 
 logger = logging.getLogger(__name__)
 
+# レスポンス・ログ・New Relic属性で共通して使うサービス名
+_SERVICE_NAME = 'distributed-service'
+
+# 接続確認用クエリ（TextClauseは不変のため使い回す）
+_CONNECTION_CHECK_QUERY = text('SELECT 1')
+
+# エラー分類テーブル: (例外クラス, エラーカテゴリ, エラーメッセージ, HTTPステータス)
+# 上から順に判定するため、より具体的な例外クラスを先に置く
+_DB_ERROR_TABLE = (
+    (DisconnectionError, "connection_lost", "データベース接続が失われました", 503),
+    (SQLTimeoutError, "timeout", "データベースクエリがタイムアウトしました", 504),
+    (IntegrityError, "constraint_violation", "データベース制約違反が発生しました", 400),
+    (OperationalError, "operational_error", "データベース操作エラーが発生しました", 500),
+    (DatabaseError, "database_error", "データベースエラーが発生しました", 500),
+)
+
+_HTTP_ERROR_TABLE = (
+    (Timeout, "timeout", "HTTP通信がタイムアウトしました", 504),
+    (ConnectionError, "connection_error", "HTTP接続エラーが発生しました", 503),
+    (RequestException, "request_error", "HTTPリクエストエラーが発生しました", 502),
+)
+
+_GENERAL_ERROR_TABLE = (
+    (ValueError, "validation_error", "入力値が無効です", 400),
+    (KeyError, "missing_parameter", "必要なパラメータが不足しています", 400),
+    (TypeError, "type_error", "データ型エラーが発生しました", 400),
+    (AttributeError, "attribute_error", "属性エラーが発生しました", 500),
+)
+
+# OperationalErrorのうち接続関連と判定されたエラーのメッセージ
+_DB_CONNECTION_FAILED_MESSAGE = "データベースへの接続に失敗しました"
+
+# 例外クラスごとの判定結果キャッシュ（2回目以降はテーブルを走査しない）
+_DB_ERROR_CACHE: Dict[type, Optional[Tuple[type, str, str, int]]] = {}
+_PSYCOPG2_ERROR_CACHE: Dict[type, Optional[Tuple[type, str, str, int]]] = {}
+_HTTP_ERROR_CACHE: Dict[type, Optional[Tuple[type, str, str, int]]] = {}
+_GENERAL_ERROR_CACHE: Dict[type, Optional[Tuple[type, str, str, int]]] = {}
+
+_NOT_CACHED = object()
+
+# New RelicのCustom Attributeとしてそのまま送信できる値の型（それ以外は文字列に変換）
+_NR_ATTRIBUTE_TYPES = (str, int, float, bool)
+
+
+@lru_cache(maxsize=1)
+def _psycopg2_error_table() -> Tuple[Tuple[type, str, str, int], ...]:
+    """
+    psycopg2の例外分類テーブルを取得（初回呼び出し時にpsycopg2をインポート）
+    
+    psycopg2の例外は通常SQLAlchemyの例外にラップされるため、
+    SQLAlchemyのテーブルに該当しなかった場合のみ参照する
+    """
+    try:
+        import psycopg2
+    except ImportError:
+        return ()
+    return (
+        (psycopg2.OperationalError, "postgresql_error", "PostgreSQL接続エラーが発生しました", 503),
+        (psycopg2.IntegrityError, "postgresql_error", "PostgreSQL制約違反が発生しました", 400),
+        (psycopg2.Error, "postgresql_error", "PostgreSQLエラーが発生しました", 500),
+    )
+
+
+def _classify_error(
+    error: Exception,
+    table: Tuple[Tuple[type, str, str, int], ...],
+    cache: Dict[type, Optional[Tuple[type, str, str, int]]]
+) -> Optional[Tuple[type, str, str, int]]:
+    """
+    例外に該当する分類テーブルのエントリを取得
+    
+    Args:
+        error (Exception): 判定対象の例外
+        table: エラー分類テーブル
+        cache: 例外クラスごとの判定結果キャッシュ
+        
+    Returns:
+        Optional[Tuple[type, str, str, int]]: 該当エントリ（該当なしの場合はNone）
+    """
+    error_class = type(error)
+    entry = cache.get(error_class, _NOT_CACHED)
+    if entry is _NOT_CACHED:
+        entry = next((row for row in table if issubclass(error_class, row[0])), None)
+        cache[error_class] = entry
+    return entry
+
+
+def _is_connection_error(error: Exception, error_message: str) -> bool:
+    """
+    OperationalErrorが接続関連のエラーかどうかを判定
+    
+    DBAPI例外のSQLSTATEが接続例外クラス（08）であればメッセージを走査せずに判定し、
+    SQLSTATEを持たないクライアント側のエラーはメッセージで判定する
+    """
+    pgcode = getattr(getattr(error, 'orig', None), 'pgcode', None)
+    if pgcode and pgcode.startswith('08'):
+        return True
+    return "connection" in error_message.lower()
+
+
+def _get_request_info() -> Dict[str, Any]:
+    """
+    現在のリクエスト情報を取得
+    リクエストコンテキスト外（バックグラウンド処理等）では例外を発生させずに空とする
+    """
+    if not has_request_context():
+        return {}
+    
+    # ヘッダーはWSGI environ（通常のdict）から直接取得
+    environ = request.environ
+    return {
+        'method': request.method,
+        'url': request.url,
+        'remote_addr': request.remote_addr,
+        'user_agent': environ.get('HTTP_USER_AGENT', ''),
+        'content_type': environ.get('CONTENT_TYPE', ''),
+        'content_length': environ.get('CONTENT_LENGTH', 0)
+    }
+
+
+def _format_traceback(error: Exception) -> str:
+    """例外自身のトレースバックを整形（トレースバックを持たない例外は空文字）"""
+    if error.__traceback__ is None:
+        return ''
+    return ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+
 
 class DistributedServiceErrorHandler:
     """分散サービス用の統合エラーハンドラー"""
@@ -47,43 +176,23 @@ class DistributedServiceErrorHandler:
             Dict[str, Any]: エラーレスポンス
         """
         error_type = "database_error"
-        error_category = "unknown"
+        timestamp = datetime.utcnow().isoformat()
+        request_info = _get_request_info()
         error_message = str(error)
-        http_status = 500
         
         # エラーの種類を判定
-        if isinstance(error, DisconnectionError):
-            error_category = "connection_lost"
-            error_message = "データベース接続が失われました"
-            http_status = 503
-        elif isinstance(error, SQLTimeoutError):
-            error_category = "timeout"
-            error_message = "データベースクエリがタイムアウトしました"
-            http_status = 504
-        elif isinstance(error, IntegrityError):
-            error_category = "constraint_violation"
-            error_message = "データベース制約違反が発生しました"
-            http_status = 400
-        elif isinstance(error, OperationalError):
-            error_category = "operational_error"
-            if "connection" in error_message.lower():
-                error_message = "データベースへの接続に失敗しました"
-                http_status = 503
-            else:
-                error_message = "データベース操作エラーが発生しました"
-        elif isinstance(error, DatabaseError):
-            error_category = "database_error"
-            error_message = "データベースエラーが発生しました"
-        elif isinstance(error, psycopg2.Error):
-            error_category = "postgresql_error"
-            if isinstance(error, psycopg2.OperationalError):
-                error_message = "PostgreSQL接続エラーが発生しました"
+        entry = _classify_error(error, _DB_ERROR_TABLE, _DB_ERROR_CACHE)
+        if entry is None:
+            entry = _classify_error(error, _psycopg2_error_table(), _PSYCOPG2_ERROR_CACHE)
+        if entry is None:
+            error_category = "unknown"
+            http_status = 500
+        else:
+            _, error_category, message, http_status = entry
+            if error_category == "operational_error" and _is_connection_error(error, error_message):
+                message = _DB_CONNECTION_FAILED_MESSAGE
                 http_status = 503
-            elif isinstance(error, psycopg2.IntegrityError):
-                error_message = "PostgreSQL制約違反が発生しました"
-                http_status = 400
-            else:
-                error_message = "PostgreSQLエラーが発生しました"
+            error_message = message
         
         # 構造化ログを出力
         DistributedServiceErrorHandler._log_structured_error(
@@ -94,7 +203,9 @@ class DistributedServiceErrorHandler:
             user_id=user_id,
             operation=operation,
             context=context,
-            http_status=http_status
+            http_status=http_status,
+            timestamp=timestamp,
+            request_info=request_info
         )
         
         # New Relicにエラーを報告
@@ -104,7 +215,9 @@ class DistributedServiceErrorHandler:
             error_category=error_category,
             user_id=user_id,
             operation=operation,
-            context=context
+            context=context,
+            timestamp=timestamp,
+            request_info=request_info
         )
         
         return {
@@ -114,8 +227,8 @@ class DistributedServiceErrorHandler:
             'message': error_message,
             'user_id': user_id,
             'operation': operation,
-            'timestamp': datetime.utcnow().isoformat(),
-            'service': 'distributed-service'
+            'timestamp': timestamp,
+            'service': _SERVICE_NAME
         }, http_status
     
     @staticmethod
@@ -138,23 +251,15 @@ class DistributedServiceErrorHandler:
             Dict[str, Any]: エラーレスポンス
         """
         error_type = "http_error"
-        error_category = "unknown"
-        error_message = str(error)
-        http_status = 500
+        timestamp = datetime.utcnow().isoformat()
+        request_info = _get_request_info()
         
         # エラーの種類を判定
-        if isinstance(error, Timeout):
-            error_category = "timeout"
-            error_message = "HTTP通信がタイムアウトしました"
-            http_status = 504
-        elif isinstance(error, ConnectionError):
-            error_category = "connection_error"
-            error_message = "HTTP接続エラーが発生しました"
-            http_status = 503
-        elif isinstance(error, RequestException):
-            error_category = "request_error"
-            error_message = "HTTPリクエストエラーが発生しました"
-            http_status = 502
+        entry = _classify_error(error, _HTTP_ERROR_TABLE, _HTTP_ERROR_CACHE)
+        if entry is None:
+            error_category, error_message, http_status = "unknown", str(error), 500
+        else:
+            _, error_category, error_message, http_status = entry
         
         # 構造化ログを出力
         DistributedServiceErrorHandler._log_structured_error(
@@ -165,7 +270,9 @@ class DistributedServiceErrorHandler:
             user_id=user_id,
             operation=operation,
             context=context,
-            http_status=http_status
+            http_status=http_status,
+            timestamp=timestamp,
+            request_info=request_info
         )
         
         # New Relicにエラーを報告
@@ -175,7 +282,9 @@ class DistributedServiceErrorHandler:
             error_category=error_category,
             user_id=user_id,
             operation=operation,
-            context=context
+            context=context,
+            timestamp=timestamp,
+            request_info=request_info
         )
         
         return {
@@ -185,8 +294,8 @@ class DistributedServiceErrorHandler:
             'message': error_message,
             'user_id': user_id,
             'operation': operation,
-            'timestamp': datetime.utcnow().isoformat(),
-            'service': 'distributed-service'
+            'timestamp': timestamp,
+            'service': _SERVICE_NAME
         }, http_status
     
     @staticmethod
@@ -209,26 +318,15 @@ class DistributedServiceErrorHandler:
             Dict[str, Any]: エラーレスポンス
         """
         error_type = "general_error"
-        error_category = type(error).__name__
-        error_message = str(error)
-        http_status = 500
+        timestamp = datetime.utcnow().isoformat()
+        request_info = _get_request_info()
         
         # 特定のエラータイプを判定
-        if isinstance(error, ValueError):
-            error_category = "validation_error"
-            error_message = "入力値が無効です"
-            http_status = 400
-        elif isinstance(error, KeyError):
-            error_category = "missing_parameter"
-            error_message = "必要なパラメータが不足しています"
-            http_status = 400
-        elif isinstance(error, TypeError):
-            error_category = "type_error"
-            error_message = "データ型エラーが発生しました"
-            http_status = 400
-        elif isinstance(error, AttributeError):
-            error_category = "attribute_error"
-            error_message = "属性エラーが発生しました"
+        entry = _classify_error(error, _GENERAL_ERROR_TABLE, _GENERAL_ERROR_CACHE)
+        if entry is None:
+            error_category, error_message, http_status = type(error).__name__, str(error), 500
+        else:
+            _, error_category, error_message, http_status = entry
         
         # 構造化ログを出力
         DistributedServiceErrorHandler._log_structured_error(
@@ -239,7 +337,9 @@ class DistributedServiceErrorHandler:
             user_id=user_id,
             operation=operation,
             context=context,
-            http_status=http_status
+            http_status=http_status,
+            timestamp=timestamp,
+            request_info=request_info
         )
         
         # New Relicにエラーを報告
@@ -249,7 +349,9 @@ class DistributedServiceErrorHandler:
             error_category=error_category,
             user_id=user_id,
             operation=operation,
-            context=context
+            context=context,
+            timestamp=timestamp,
+            request_info=request_info
         )
         
         return {
@@ -259,8 +361,8 @@ class DistributedServiceErrorHandler:
             'message': error_message,
             'user_id': user_id,
             'operation': operation,
-            'timestamp': datetime.utcnow().isoformat(),
-            'service': 'distributed-service'
+            'timestamp': timestamp,
+            'service': _SERVICE_NAME
         }, http_status
     
     @staticmethod
@@ -272,7 +374,9 @@ class DistributedServiceErrorHandler:
         user_id: Optional[int] = None,
         operation: Optional[str] = None,
         context: Optional[Dict[str, Any]] = None,
-        http_status: int = 500
+        http_status: int = 500,
+        timestamp: Optional[str] = None,
+        request_info: Optional[Dict[str, Any]] = None
     ):
         """
         構造化されたエラーログを出力
@@ -286,34 +390,29 @@ class DistributedServiceErrorHandler:
             operation (Optional[str]): 操作名
             context (Optional[Dict[str, Any]]): コンテキスト情報
             http_status (int): HTTPステータスコード
+            timestamp (Optional[str]): エラー発生時刻（ISO形式、省略時は現在時刻）
+            request_info (Optional[Dict[str, Any]]): リクエスト情報（省略時は現在のリクエストから取得）
         """
-        # リクエスト情報を取得
-        request_info = {}
-        try:
-            if request:
-                request_info = {
-                    'method': request.method,
-                    'url': request.url,
-                    'remote_addr': request.remote_addr,
-                    'user_agent': request.headers.get('User-Agent', ''),
-                    'content_type': request.headers.get('Content-Type', ''),
-                    'content_length': request.headers.get('Content-Length', 0)
-                }
-        except:
-            pass
+        # ERRORレベルが出力されない設定ではトレースバック整形やログデータ構築を行わない
+        if not logger.isEnabledFor(logging.ERROR):
+            return
+        
+        # リクエスト情報を取得（呼び出し元で取得済みの場合はそれを使用）
+        if request_info is None:
+            request_info = _get_request_info()
         
         # 構造化ログデータを作成
         log_data = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': timestamp or datetime.utcnow().isoformat(),
             'level': 'ERROR',
-            'service': 'distributed-service',
+            'service': _SERVICE_NAME,
             'error': {
                 'type': error_type,
                 'category': error_category,
                 'message': error_message,
                 'exception_type': type(original_error).__name__,
                 'exception_message': str(original_error),
-                'traceback': traceback.format_exc()
+                'traceback': _format_traceback(original_error)
             },
             'request': request_info,
             'user_id': user_id,
@@ -323,13 +422,15 @@ class DistributedServiceErrorHandler:
         }
         
         # JSONログとして出力
-        logger.error(f"STRUCTURED_ERROR: {log_data}")
-        
-        # 通常のログも出力（可読性のため）
         logger.error(
-            f"Error occurred - Type: {error_type}, Category: {error_category}, "
-            f"Message: {error_message}, User: {user_id}, Operation: {operation}, "
-            f"Status: {http_status}"
+            "STRUCTURED_ERROR: %s",
+            json.dumps(log_data, ensure_ascii=False, default=str, separators=(',', ':'))
+        )
+        
+        # 可読性のための要約ログはDEBUG時のみ出力（ERRORレコードは1エラーにつき1件）
+        logger.debug(
+            "Error occurred - Type: %s, Category: %s, Message: %s, User: %s, Operation: %s, Status: %s",
+            error_type, error_category, error_message, user_id, operation, http_status
         )
     
     @staticmethod
@@ -339,7 +440,9 @@ class DistributedServiceErrorHandler:
         error_category: str,
         user_id: Optional[int] = None,
         operation: Optional[str] = None,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[str] = None,
+        request_info: Optional[Dict[str, Any]] = None
     ):
         """
         New Relicにエラーを報告
@@ -351,41 +454,49 @@ class DistributedServiceErrorHandler:
             user_id (Optional[int]): ユーザーID
             operation (Optional[str]): 操作名
             context (Optional[Dict[str, Any]]): コンテキスト情報
+            timestamp (Optional[str]): エラー発生時刻（ISO形式、省略時は現在時刻）
+            request_info (Optional[Dict[str, Any]]): リクエスト情報（省略時は現在のリクエストから取得）
         """
         try:
-            # Custom Attributeを設定
+            # トランザクション外（エージェント未起動・バックグラウンド処理等）では
+            # 属性もエラーも記録されないため、属性リストの構築自体を行わない
+            if newrelic.agent.current_transaction() is None:
+                return
+            
+            # Custom Attributeをまとめて作成し、エージェントAPIは1回だけ呼び出す
+            attributes = [
+                ('error_type', error_type),
+                ('error_category', error_category),
+                ('service_name', _SERVICE_NAME),
+                ('error_timestamp', timestamp or datetime.utcnow().isoformat())
+            ]
+            
             if user_id:
-                newrelic.agent.add_custom_attribute('error_user_id', user_id)
-                newrelic.agent.add_custom_attribute('user_id', user_id)
+                attributes.append(('error_user_id', user_id))
+                attributes.append(('user_id', user_id))
             
             if operation:
-                newrelic.agent.add_custom_attribute('error_operation', operation)
-                newrelic.agent.add_custom_attribute('operation_type', operation)
-            
-            newrelic.agent.add_custom_attribute('error_type', error_type)
-            newrelic.agent.add_custom_attribute('error_category', error_category)
-            newrelic.agent.add_custom_attribute('service_name', 'distributed-service')
-            newrelic.agent.add_custom_attribute('error_timestamp', datetime.utcnow().isoformat())
+                attributes.append(('error_operation', operation))
+                attributes.append(('operation_type', operation))
             
             # コンテキスト情報をCustom Attributeとして追加
+            # New Relicは特定の型のみサポートするため、それ以外は文字列に変換
+            # （変換後は一括で送信し、キーごとの例外処理は行わない）
             if context:
-                for key, value in context.items():
-                    try:
-                        # New Relicは特定の型のみサポートするため、文字列に変換
-                        attr_key = f"context_{key}"
-                        attr_value = str(value) if not isinstance(value, (str, int, float, bool)) else value
-                        newrelic.agent.add_custom_attribute(attr_key, attr_value)
-                    except Exception as attr_error:
-                        logger.warning(f"Failed to set custom attribute {key}: {attr_error}")
+                attributes.extend([
+                    (f"context_{key}", value if isinstance(value, _NR_ATTRIBUTE_TYPES) else str(value))
+                    for key, value in context.items()
+                ])
             
             # リクエスト情報をCustom Attributeとして追加
-            try:
-                if request:
-                    newrelic.agent.add_custom_attribute('request_method', request.method)
-                    newrelic.agent.add_custom_attribute('request_url', request.url)
-                    newrelic.agent.add_custom_attribute('request_remote_addr', request.remote_addr)
-            except:
-                pass
+            if request_info is None:
+                request_info = _get_request_info()
+            if request_info:
+                attributes.append(('request_method', request_info['method']))
+                attributes.append(('request_url', request_info['url']))
+                attributes.append(('request_remote_addr', request_info['remote_addr']))
+            
+            newrelic.agent.add_custom_attributes(attributes)
             
             # エラーをNew Relicに記録
             newrelic.agent.notice_error()
@@ -411,8 +522,7 @@ class DatabaseConnectionManager:
             bool: 接続が正常かどうか
         """
         try:
-            from sqlalchemy import text
-            db.session.execute(text('SELECT 1'))
+            db.session.execute(_CONNECTION_CHECK_QUERY)
             db.session.commit()
             return True
         except Exception as e:
@@ -420,7 +530,13 @@ class DatabaseConnectionManager:
             return False
     
     @staticmethod
-    def reconnect_with_retry(db, max_retries: int = 3, retry_delay: float = 1.0) -> bool:
+    def reconnect_with_retry(
+        db,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 2.0,
+        max_total_wait: float = 5.0
+    ) -> bool:
         """
         データベース再接続をリトライ付きで実行
         
@@ -428,10 +544,15 @@ class DatabaseConnectionManager:
             db: SQLAlchemyデータベースインスタンス
             max_retries (int): 最大リトライ回数
             retry_delay (float): リトライ間隔（秒）
+            max_retry_delay (float): 指数バックオフ時のリトライ間隔の上限（秒）
+            max_total_wait (float): リトライ待機時間の合計上限（秒）
             
         Returns:
             bool: 再接続が成功したかどうか
         """
+        # リクエスト処理スレッドを長時間ブロックしないよう、待機時間の合計に上限を設ける
+        deadline = time.monotonic() + max_total_wait
+        
         for attempt in range(max_retries):
             try:
                 logger.info(f"Database reconnection attempt {attempt + 1}/{max_retries}")
@@ -452,8 +573,12 @@ class DatabaseConnectionManager:
                 logger.error(f"Database reconnection attempt {attempt + 1} failed: {e}")
             
             if attempt < max_retries - 1:
-                time.sleep(retry_delay)
-                retry_delay *= 2  # 指数バックオフ
+                sleep_for = min(retry_delay, deadline - time.monotonic())
+                if sleep_for <= 0:
+                    logger.warning("Database reconnection wait budget exhausted")
+                    break
+                time.sleep(sleep_for)
+                retry_delay = min(retry_delay * 2, max_retry_delay)  # 上限付き指数バックオフ
         
         logger.error("Database reconnection failed after all attempts")
         return False
@@ -467,60 +592,14 @@ def create_error_handlers(app):
         app: Flaskアプリケーションインスタンス
     """
     
-    @app.errorhandler(SQLAlchemyError)
-    def handle_sqlalchemy_error(error):
-        """SQLAlchemyエラーハンドラー"""
-        user_id = getattr(request, 'user_id', None)
-        operation = getattr(request, 'operation', None)
-        
-        response_data, status_code = DistributedServiceErrorHandler.handle_database_error(
-            error=error,
-            user_id=user_id,
-            operation=operation,
-            context={'endpoint': request.endpoint, 'method': request.method}
-        )
-        
-        return jsonify(response_data), status_code
-    
-    @app.errorhandler(RequestException)
-    def handle_request_error(error):
-        """HTTPリクエストエラーハンドラー"""
-        user_id = getattr(request, 'user_id', None)
-        operation = getattr(request, 'operation', None)
-        
-        response_data, status_code = DistributedServiceErrorHandler.handle_http_error(
-            error=error,
-            user_id=user_id,
-            operation=operation,
-            context={'endpoint': request.endpoint, 'method': request.method}
-        )
-        
-        return jsonify(response_data), status_code
-    
-    @app.errorhandler(500)
-    def handle_internal_server_error(error):
-        """内部サーバーエラーハンドラー"""
-        user_id = getattr(request, 'user_id', None)
-        operation = getattr(request, 'operation', None)
-        
-        # 元のエラーを取得
-        original_error = getattr(error, 'original_exception', error)
-        
-        response_data, status_code = DistributedServiceErrorHandler.handle_general_error(
-            error=original_error,
-            user_id=user_id,
-            operation=operation,
-            context={'endpoint': request.endpoint, 'method': request.method}
-        )
-        
-        return jsonify(response_data), status_code
+    # 例外の基底クラスごとの処理先（上から順に判定、該当なしは一般エラー）
+    error_dispatch = (
+        (SQLAlchemyError, DistributedServiceErrorHandler.handle_database_error),
+        (RequestException, DistributedServiceErrorHandler.handle_http_error),
+    )
     
-    @app.errorhandler(400)
-    def handle_bad_request(error):
-        """不正なリクエストエラーハンドラー"""
-        user_id = getattr(request, 'user_id', None)
-        operation = getattr(request, 'operation', None)
-        
+    def handle_bad_request(user_id, operation):
+        """不正なリクエストのレスポンスを作成"""
         response_data = {
             'status': 'error',
             'error_type': 'bad_request',
@@ -529,7 +608,7 @@ def create_error_handlers(app):
             'user_id': user_id,
             'operation': operation,
             'timestamp': datetime.utcnow().isoformat(),
-            'service': 'distributed-service'
+            'service': _SERVICE_NAME
         }
         
         # New Relicに報告
@@ -543,4 +622,33 @@ def create_error_handlers(app):
         
         return jsonify(response_data), 400
     
+    def handle_error(error):
+        """統合エラーハンドラー（リクエスト属性を1回だけ取得し、例外の種類に応じて振り分け）"""
+        user_id = getattr(request, 'user_id', None)
+        operation = getattr(request, 'operation', None)
+        
+        if isinstance(error, HTTPException):
+            if error.code == 400:
+                return handle_bad_request(user_id, operation)
+            
+            # 内部サーバーエラーは元のエラーを取得
+            error = getattr(error, 'original_exception', None) or error
+        
+        handler = next(
+            (candidate for error_class, candidate in error_dispatch if isinstance(error, error_class)),
+            DistributedServiceErrorHandler.handle_general_error
+        )
+        response_data, status_code = handler(
+            error=error,
+            user_id=user_id,
+            operation=operation,
+            context={'endpoint': request.endpoint, 'method': request.method}
+        )
+        
+        return jsonify(response_data), status_code
+    
+    # PROPAGATE_EXCEPTIONSの挙動を変えないよう、Exception全体ではなく従来と同じ対象にのみ登録
+    for error_key in (SQLAlchemyError, RequestException, 500, 400):
+        app.register_error_handler(error_key, handle_error)
+    
     logger.info("Error handlers registered successfully")
\ No newline at end of file
@@ -3,13 +3,45 @@
 構造化ログ出力とNew Relic統合
 """
 
+import atexit
+import copy
 import logging
 import logging.config
 import json
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+try:
+    import orjson
+except ImportError:  # orjson未導入環境では標準jsonにフォールバック
+    orjson = None
+
+
+def _dumps_log_data(log_data: Dict[str, Any]) -> str:
+    """ログデータをJSON文字列に変換（orjsonがあれば使用）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(log_data, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except orjson.JSONEncodeError:
+            # 64bitを超える整数などorjsonが扱えない値は標準jsonで出力
+            pass
+    return json.dumps(log_data, ensure_ascii=False, default=str)
+
+
+# LogRecordの標準属性（これ以外の属性をextraとして出力する）
+# message/asctimeは他のフォーマッターが同じレコードに設定する場合があるため除外し、
+# taskNameはPython 3.12以降で全レコードに追加される
+_STANDARD_RECORD_ATTRS = frozenset({
+    'name', 'msg', 'args', 'levelname', 'levelno', 'pathname',
+    'filename', 'module', 'lineno', 'funcName', 'created',
+    'msecs', 'relativeCreated', 'thread', 'threadName',
+    'processName', 'process', 'getMessage', 'exc_info',
+    'exc_text', 'stack_info', 'message', 'asctime', 'taskName'
+})
+
 
 class StructuredFormatter(logging.Formatter):
     """構造化ログフォーマッター（JSON形式）"""
@@ -17,13 +49,28 @@ class StructuredFormatter(logging.Formatter):
     def __init__(self, service_name: str = "distributed-service"):
         super().__init__()
         self.service_name = service_name
+        # 直近に整形した秒とそのISO形式文字列（タプルごと置き換えるためスレッド間で共有可能）
+        self._second_cache = (None, '')
+    
+    def _format_timestamp(self, created: float) -> str:
+        """
+        レコード作成時刻をISO形式（UTC、マイクロ秒付き）に整形
+        
+        同一秒内のレコードでは秒までの文字列を再利用し、マイクロ秒部分のみ整形する
+        """
+        second = int(created)
+        cached_second, prefix = self._second_cache
+        if cached_second != second:
+            prefix = datetime.utcfromtimestamp(second).isoformat()
+            self._second_cache = (second, prefix)
+        return '%s.%06d' % (prefix, (created - second) * 1000000)
     
     def format(self, record: logging.LogRecord) -> str:
         """ログレコードをJSON形式にフォーマット"""
         
         # 基本的なログデータ
         log_data = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': self._format_timestamp(record.created),
             'level': record.levelname,
             'service': self.service_name,
             'logger': record.name,
@@ -35,26 +82,24 @@ class StructuredFormatter(logging.Formatter):
         
         # 例外情報があれば追加
         if record.exc_info:
+            # 整形済みトレースバックはレコードに保持し、複数ハンドラーで再整形しない
+            # （標準のFormatterと同じくexc_textを使用）
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
             log_data['exception'] = {
                 'type': record.exc_info[0].__name__ if record.exc_info[0] else None,
                 'message': str(record.exc_info[1]) if record.exc_info[1] else None,
-                'traceback': self.formatException(record.exc_info)
+                'traceback': record.exc_text
             }
         
-        # カスタム属性があれば追加
-        extra_fields = {}
-        for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 
-                          'filename', 'module', 'lineno', 'funcName', 'created', 
-                          'msecs', 'relativeCreated', 'thread', 'threadName', 
-                          'processName', 'process', 'getMessage', 'exc_info', 
-                          'exc_text', 'stack_info']:
-                extra_fields[key] = value
-        
-        if extra_fields:
-            log_data['extra'] = extra_fields
+        # カスタム属性があれば追加（標準属性のみのレコードは属性ごとの走査を省略）
+        if not _STANDARD_RECORD_ATTRS.issuperset(record.__dict__):
+            log_data['extra'] = {
+                key: value for key, value in record.__dict__.items()
+                if key not in _STANDARD_RECORD_ATTRS
+            }
         
-        return json.dumps(log_data, ensure_ascii=False, default=str)
+        return _dumps_log_data(log_data)
 
 
 class PerformanceLogger:
@@ -81,21 +126,23 @@ class PerformanceLogger:
             execution_time (float): 実行時間（秒）
             additional_data (Optional[Dict[str, Any]]): 追加データ
         """
+        # 出力されないレベルの場合はログデータやメッセージを構築しない
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        
         log_data = {
             'type': 'query_performance',
             'operation': operation,
             'user_id': user_id,
             'query_count': query_count,
             'execution_time_seconds': execution_time,
-            'queries_per_second': query_count / execution_time if execution_time > 0 else 0
+            'queries_per_second': query_count / execution_time if execution_time > 0 else 0,
+            **(additional_data or {})
         }
         
-        if additional_data:
-            log_data.update(additional_data)
-        
         self.logger.info(
-            f"Query performance - Operation: {operation}, "
-            f"Queries: {query_count}, Time: {execution_time:.3f}s",
+            "Query performance - Operation: %s, Queries: %s, Time: %.3fs",
+            operation, query_count, execution_time,
             extra=log_data
         )
     
@@ -121,6 +168,12 @@ class PerformanceLogger:
             operation (Optional[str]): 操作名
             additional_data (Optional[Dict[str, Any]]): 追加データ
         """
+        level = logging.INFO if 200 <= status_code < 400 else logging.WARNING
+        
+        # 出力されないレベルの場合はログデータやメッセージを構築しない
+        if not self.logger.isEnabledFor(level):
+            return
+        
         log_data = {
             'type': 'http_request',
             'method': method,
@@ -128,17 +181,14 @@ class PerformanceLogger:
             'status_code': status_code,
             'execution_time_seconds': execution_time,
             'user_id': user_id,
-            'operation': operation
+            'operation': operation,
+            **(additional_data or {})
         }
         
-        if additional_data:
-            log_data.update(additional_data)
-        
-        level = logging.INFO if 200 <= status_code < 400 else logging.WARNING
-        
         self.logger.log(
             level,
-            f"HTTP {method} {url} - Status: {status_code}, Time: {execution_time:.3f}s",
+            "HTTP %s %s - Status: %s, Time: %.3fs",
+            method, url, status_code, execution_time,
             extra=log_data
         )
     
@@ -162,25 +212,36 @@ class PerformanceLogger:
             user_id (Optional[int]): ユーザーID
             additional_data (Optional[Dict[str, Any]]): 追加データ
         """
+        # 出力されないレベルの場合はログデータやメッセージを構築しない
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        
         log_data = {
             'type': 'database_operation',
             'operation': operation,
             'table_name': table_name,
             'record_count': record_count,
             'execution_time_seconds': execution_time,
-            'user_id': user_id
+            'user_id': user_id,
+            **(additional_data or {})
         }
         
-        if additional_data:
-            log_data.update(additional_data)
-        
         self.logger.info(
-            f"DB {operation} {table_name or ''} - "
-            f"Records: {record_count}, Time: {execution_time:.3f}s",
+            "DB %s %s - Records: %s, Time: %.3fs",
+            operation, table_name or '', record_count, execution_time,
             extra=log_data
         )
 
 
+# 疑わしい活動の重要度とログレベルの対応
+_SEVERITY_TO_LEVEL = {
+    'low': logging.INFO,
+    'medium': logging.WARNING,
+    'high': logging.ERROR,
+    'critical': logging.CRITICAL
+}
+
+
 class SecurityLogger:
     """セキュリティ関連ログ機能"""
     
@@ -207,24 +268,26 @@ class SecurityLogger:
             user_agent (Optional[str]): ユーザーエージェント
             additional_data (Optional[Dict[str, Any]]): 追加データ
         """
+        level = logging.INFO if success else logging.WARNING
+        
+        # 出力されないレベルの場合はログデータやメッセージを構築しない
+        if not self.logger.isEnabledFor(level):
+            return
+        
         log_data = {
             'type': 'authentication_attempt',
             'user_id': user_id,
             'username': username,
             'success': success,
             'ip_address': ip_address,
-            'user_agent': user_agent
+            'user_agent': user_agent,
+            **(additional_data or {})
         }
         
-        if additional_data:
-            log_data.update(additional_data)
-        
-        level = logging.INFO if success else logging.WARNING
-        
         self.logger.log(
             level,
-            f"Authentication {'successful' if success else 'failed'} - "
-            f"User: {username or user_id}, IP: {ip_address}",
+            "Authentication %s - User: %s, IP: %s",
+            'successful' if success else 'failed', username or user_id, ip_address,
             extra=log_data
         )
     
@@ -248,35 +311,95 @@ class SecurityLogger:
             severity (str): 重要度（low, medium, high, critical）
             additional_data (Optional[Dict[str, Any]]): 追加データ
         """
+        # 重要度に応じてログレベルを設定
+        level = _SEVERITY_TO_LEVEL.get(severity, logging.WARNING)
+        
+        # 出力されないレベルの場合はログデータやメッセージを構築しない
+        if not self.logger.isEnabledFor(level):
+            return
+        
         log_data = {
             'type': 'suspicious_activity',
             'activity_type': activity_type,
             'description': description,
             'user_id': user_id,
             'ip_address': ip_address,
-            'severity': severity
-        }
-        
-        if additional_data:
-            log_data.update(additional_data)
-        
-        # 重要度に応じてログレベルを設定
-        level_map = {
-            'low': logging.INFO,
-            'medium': logging.WARNING,
-            'high': logging.ERROR,
-            'critical': logging.CRITICAL
+            'severity': severity,
+            **(additional_data or {})
         }
-        level = level_map.get(severity, logging.WARNING)
         
         self.logger.log(
             level,
-            f"Suspicious activity detected - Type: {activity_type}, "
-            f"User: {user_id}, IP: {ip_address}, Severity: {severity}",
+            "Suspicious activity detected - Type: %s, User: %s, IP: %s, Severity: %s",
+            activity_type, user_id, ip_address, severity,
             extra=log_data
         )
 
 
+class DeferredFormatQueueHandler(QueueHandler):
+    """
+    LogRecordをキューに積むだけのハンドラー
+    
+    標準のQueueHandlerはキューに積む前にレコードを整形してしまうため、
+    メッセージ引数の展開のみ行い、JSON整形やトレースバック整形は
+    リスナースレッド側のハンドラー（StructuredFormatter）に任せる
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 引数が後から変更されても影響しないよう、メッセージのみ呼び出し元スレッドで確定させる
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+# 出力ハンドラーを実行するバックグラウンドリスナー（非同期ログ有効時のみ）
+_queue_listener: Optional[QueueListener] = None
+
+
+def _stop_queue_listener():
+    """キューに残っているログを出力してからリスナーを停止"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(_stop_queue_listener)
+
+
+def _start_queue_listener(logger_names) -> QueueListener:
+    """
+    設定済みロガーの出力ハンドラーをバックグラウンドスレッドへ移す
+    
+    各ロガーにはキューへ積むだけのハンドラーを設定し、
+    JSON整形と標準出力・ファイルへの書き込みはリスナースレッドで行う
+    
+    Args:
+        logger_names: 対象ロガー名の一覧
+        
+    Returns:
+        QueueListener: 開始したリスナー
+    """
+    global _queue_listener
+    
+    # dictConfigで作成されたハンドラーを重複なく収集（全ロガーで同じインスタンスを共有している）
+    handlers = []
+    for name in logger_names:
+        for handler in logging.getLogger(name).handlers:
+            if handler not in handlers:
+                handlers.append(handler)
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredFormatQueueHandler(log_queue)
+    for name in logger_names:
+        logging.getLogger(name).handlers = [queue_handler]
+    
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+    return _queue_listener
+
+
 def setup_logging(
     log_level: str = "INFO",
     log_format: str = "structured",
@@ -330,34 +453,37 @@ def setup_logging(
             'filename': log_file,
             'maxBytes': 10485760,  # 10MB
             'backupCount': 5,
-            'encoding': 'utf-8'
+            'encoding': 'utf-8',
+            # 最初のレコードを出力するまでファイルを開かない
+            'delay': True
         }
     
-    # ロガー設定
+    # ロガー設定（全ロガーで同じハンドラーを使用）
+    handler_names = list(handlers)
     loggers = {
         '': {  # ルートロガー
             'level': log_level.upper(),
-            'handlers': list(handlers.keys()),
+            'handlers': handler_names,
             'propagate': False
         },
         'performance': {
             'level': 'INFO',
-            'handlers': list(handlers.keys()),
+            'handlers': handler_names,
             'propagate': False
         },
         'security': {
             'level': 'INFO',
-            'handlers': list(handlers.keys()),
+            'handlers': handler_names,
             'propagate': False
         },
         'sqlalchemy.engine': {
             'level': 'INFO',
-            'handlers': list(handlers.keys()),
+            'handlers': handler_names,
             'propagate': False
         },
         'newrelic': {
             'level': 'WARNING',
-            'handlers': list(handlers.keys()),
+            'handlers': handler_names,
             'propagate': False
         }
     }
@@ -374,7 +500,12 @@ def setup_logging(
     return config
 
 
-def configure_app_logging(app, log_level: str = None, log_format: str = None):
+def configure_app_logging(
+    app,
+    log_level: str = None,
+    log_format: str = None,
+    log_async: Optional[bool] = None
+):
     """
     Flaskアプリケーションのログ設定
     
@@ -382,11 +513,14 @@ def configure_app_logging(app, log_level: str = None, log_format: str = None):
         app: Flaskアプリケーションインスタンス
         log_level (str): ログレベル（環境変数から取得可能）
         log_format (str): ログフォーマット（環境変数から取得可能）
+        log_async (Optional[bool]): ログ出力をバックグラウンドスレッドで行うか（環境変数から取得可能）
     """
     
     # 環境変数から設定を取得
     log_level = log_level or os.getenv('LOG_LEVEL', 'INFO')
     log_format = log_format or os.getenv('LOG_FORMAT', 'structured')
+    if log_async is None:
+        log_async = os.getenv('LOG_ASYNC', 'true').lower() != 'false'
     log_file = os.getenv('LOG_FILE')
     service_name = os.getenv('SERVICE_NAME', 'distributed-service')
     
@@ -398,9 +532,16 @@ def configure_app_logging(app, log_level: str = None, log_format: str = None):
         service_name=service_name
     )
     
+    # 再設定時は古いハンドラーが閉じられる前に、前回のリスナーのキューを出し切る
+    _stop_queue_listener()
+    
     # ログ設定を適用
     logging.config.dictConfig(config)
     
+    # リクエスト処理スレッドではキューに積むだけにし、整形と書き込みはリスナースレッドで行う
+    if log_async:
+        _start_queue_listener(config['loggers'].keys())
+    
     # Flaskアプリケーションのログレベルを設定
     app.logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
     
@@ -408,7 +549,7 @@ def configure_app_logging(app, log_level: str = None, log_format: str = None):
     logger = logging.getLogger(__name__)
     logger.info(
         f"Logging configured - Level: {log_level}, Format: {log_format}, "
-        f"Service: {service_name}, File: {log_file or 'None'}"
+        f"Service: {service_name}, File: {log_file or 'None'}, Async: {log_async}"
     )
     
     return config
@@ -8,7 +8,6 @@ import os
 import sys
 import logging
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate, init, migrate, upgrade, downgrade
 
 # ログ設定
@@ -30,12 +29,11 @@ def create_app():
 
 def setup_database(app):
     """データベースとマイグレーションの設定"""
-    db = SQLAlchemy(app)
+    # モデルはmodelsモジュールのインポート時に登録済み（マイグレーション検出のため）
+    from models import db
+    db.init_app(app)
     migrate = Migrate(app, db)
     
-    # モデルをインポート（マイグレーション検出のため）
-    from models import User, Product, Order, OrderItem, CartItem
-    
     return db, migrate
 
 def init_migrations():
@@ -82,6 +80,45 @@ def rollback_migration():
         logger.error(f"マイグレーションロールバックエラー: {e}")
         return False
 
+def run_command(command, args):
+    """
+    コマンドを実行（アプリケーションコンテキスト内で呼び出す）
+    
+    Args:
+        command (str): コマンド名
+        args (list): コマンド引数
+    """
+    if command == "init":
+        init_migrations()
+    elif command == "migrate":
+        message = args[0] if args else "Auto migration"
+        create_migration(message)
+    elif command == "upgrade":
+        apply_migrations()
+    elif command == "downgrade":
+        rollback_migration()
+    else:
+        print(f"不明なコマンド: {command}")
+
+def run_repl():
+    """対話モード（アプリケーション・エンジン・接続プールを複数コマンドで使い回す）"""
+    print("対話モード: init / migrate [メッセージ] / upgrade / downgrade / exit")
+    while True:
+        try:
+            line = input("manage_db> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            break
+        
+        if not line:
+            continue
+        if line in ("exit", "quit"):
+            break
+        
+        # マイグレーションメッセージは空白を含めてそのまま渡す
+        command, *args = line.split(maxsplit=1)
+        run_command(command, args)
+
 def main():
     """メイン関数"""
     if len(sys.argv) < 2:
@@ -90,6 +127,7 @@ def main():
         print("  python manage_db.py migrate       - マイグレーション作成")
         print("  python manage_db.py upgrade       - マイグレーション適用")
         print("  python manage_db.py downgrade     - マイグレーションロールバック")
+        print("  python manage_db.py repl          - 対話モード（複数コマンドを連続実行）")
         return
     
     command = sys.argv[1]
@@ -99,17 +137,10 @@ def main():
     with app.app_context():
         db, migrate_instance = setup_database(app)
         
-        if command == "init":
-            init_migrations()
-        elif command == "migrate":
-            message = sys.argv[2] if len(sys.argv) > 2 else "Auto migration"
-            create_migration(message)
-        elif command == "upgrade":
-            apply_migrations()
-        elif command == "downgrade":
-            rollback_migration()
+        if command == "repl":
+            run_repl()
         else:
-            print(f"不明なコマンド: {command}")
+            run_command(command, sys.argv[2:])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
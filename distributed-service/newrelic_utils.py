@@ -5,14 +5,20 @@ Custom Attributeの設定と分散トレーシングヘッダーの処理
 """
 
 import newrelic.agent
-from flask import request
+from flask import has_request_context, request
 import logging
 import traceback
 from datetime import datetime
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
+# エラー報告に含めるスタックトレースのフレーム数（発生箇所側から数える）
+_STACK_TRACE_FRAME_LIMIT = 8
+
+# New Relicへそのまま送れる属性値の型（サブクラスは文字列化して送る）
+_SCALAR_TYPES = frozenset((str, int, float, bool))
+
 
 def set_user_custom_attribute(user_id: Optional[Union[int, str]]):
     """
@@ -23,12 +29,18 @@ def set_user_custom_attribute(user_id: Optional[Union[int, str]]):
     """
     try:
         if user_id is not None:
+            # トランザクション外では属性を記録できないため何もしない
+            transaction = newrelic.agent.current_transaction()
+            if transaction is None:
+                return
+            
             # ユーザーIDを文字列として設定（New Relicの推奨）
             user_id_str = str(user_id)
-            newrelic.agent.add_custom_attribute('user_id', user_id_str)
-            newrelic.agent.add_custom_attribute('enduser.id', user_id_str)
-            newrelic.agent.add_custom_attribute('service_name', 'distributed-service')
-            logger.debug(f"Custom attribute set: user_id={user_id_str}")
+            transaction.add_custom_attributes([
+                ('user_id', user_id_str),
+                ('enduser.id', user_id_str)
+            ])
+            logger.debug("Custom attribute set: user_id=%s", user_id_str)
     except Exception as e:
         logger.error(f"Failed to set user custom attribute: {e}")
 
@@ -42,9 +54,15 @@ def set_operation_custom_attribute(operation_type: str):
     """
     try:
         if operation_type:
-            newrelic.agent.add_custom_attribute('operation_type', operation_type)
-            newrelic.agent.add_custom_attribute('operation_name', operation_type)
-            logger.debug(f"Custom attribute set: operation_type={operation_type}")
+            transaction = newrelic.agent.current_transaction()
+            if transaction is None:
+                return
+            
+            transaction.add_custom_attributes([
+                ('operation_type', operation_type),
+                ('operation_name', operation_type)
+            ])
+            logger.debug("Custom attribute set: operation_type=%s", operation_type)
     except Exception as e:
         logger.error(f"Failed to set operation custom attribute: {e}")
 
@@ -65,28 +83,34 @@ def set_performance_attributes(
         additional_attributes (Optional[Dict[str, Any]]): 追加属性
     """
     try:
+        transaction = newrelic.agent.current_transaction()
+        if transaction is None:
+            return
+        
+        # Custom Attributeをまとめて作成し、エージェントAPIは1回だけ呼び出す
+        attributes = []
+        
         if execution_time is not None:
-            newrelic.agent.add_custom_attribute('execution_time_seconds', execution_time)
-            newrelic.agent.add_custom_attribute('performance.execution_time', execution_time)
+            attributes.append(('execution_time_seconds', execution_time))
+            attributes.append(('performance.execution_time', execution_time))
         
         if query_count is not None:
-            newrelic.agent.add_custom_attribute('query_count', query_count)
-            newrelic.agent.add_custom_attribute('database.query_count', query_count)
+            attributes.append(('query_count', query_count))
+            attributes.append(('database.query_count', query_count))
         
         if record_count is not None:
-            newrelic.agent.add_custom_attribute('record_count', record_count)
-            newrelic.agent.add_custom_attribute('database.record_count', record_count)
+            attributes.append(('record_count', record_count))
+            attributes.append(('database.record_count', record_count))
         
         if additional_attributes:
-            for key, value in additional_attributes.items():
-                try:
-                    # New Relicは特定の型のみサポートするため適切に変換
-                    if isinstance(value, (str, int, float, bool)):
-                        newrelic.agent.add_custom_attribute(key, value)
-                    else:
-                        newrelic.agent.add_custom_attribute(key, str(value))
-                except Exception as attr_error:
-                    logger.warning(f"Failed to set custom attribute {key}: {attr_error}")
+            # New Relicは特定の型のみサポートするため適切に変換
+            attributes.extend([
+                (key, value if type(value) in _SCALAR_TYPES else str(value))
+                for key, value in additional_attributes.items()
+            ])
+        
+        if attributes:
+            transaction.add_custom_attributes(attributes)
         
         logger.debug("Performance attributes set successfully")
     except Exception as e:
@@ -102,18 +126,24 @@ def process_distributed_trace_headers():
     """
     try:
         # リクエストヘッダーから分散トレーシング情報を受け入れ
-        if request and request.headers:
-            newrelic.agent.accept_distributed_trace_headers(request.headers)
+        if has_request_context():
+            # LocalProxyの解決は1回だけ行い、以降は実体のリクエストを参照
+            req = request._get_current_object()
+            newrelic.agent.accept_distributed_trace_headers(req.headers)
             
             # リクエスト情報もCustom Attributeとして設定
-            newrelic.agent.add_custom_attribute('request.method', request.method)
-            newrelic.agent.add_custom_attribute('request.url', request.url)
-            newrelic.agent.add_custom_attribute('request.remote_addr', request.remote_addr)
+            attributes = [
+                ('request.method', req.method),
+                ('request.url', req.url),
+                ('request.remote_addr', req.remote_addr)
+            ]
             
-            # User-Agentがあれば設定
-            user_agent = request.headers.get('User-Agent')
+            # User-Agentがあれば設定（ヘッダーはWSGI environから直接取得）
+            user_agent = req.environ.get('HTTP_USER_AGENT')
             if user_agent:
-                newrelic.agent.add_custom_attribute('request.user_agent', user_agent[:200])  # 長さ制限
+                attributes.append(('request.user_agent', user_agent[:200]))  # 長さ制限
+            
+            newrelic.agent.add_custom_attributes(attributes)
             
             logger.debug("Distributed trace headers processed successfully")
             return True
@@ -125,6 +155,82 @@ def process_distributed_trace_headers():
         return False
 
 
+def _build_error_attributes(
+    error: Exception,
+    user_id: Optional[Union[int, str]],
+    operation_type: Optional[str],
+    context: Optional[Dict[str, Any]],
+    error_category: Optional[str]
+) -> List[Tuple[str, Any]]:
+    """
+    エラー報告用のCustom Attribute一覧を作成
+    
+    Args:
+        report_error_to_newrelicの引数と同じ
+        
+    Returns:
+        List[Tuple[str, Any]]: 属性名と値の組（呼び出し元でまとめて送信する）
+    """
+    # 基本的なエラー情報をCustom Attributeとして設定
+    attributes = [
+        ('error.type', type(error).__name__),
+        ('error.message', str(error)),
+        ('error.timestamp', datetime.utcnow().isoformat())
+    ]
+    
+    # ユーザーIDを設定（エラーはトランザクションに紐づくため、error.接頭辞付きの重複キーは送らない）
+    if user_id is not None:
+        user_id_str = str(user_id)
+        attributes.append(('user_id', user_id_str))
+        attributes.append(('enduser.id', user_id_str))
+    
+    # 操作タイプを設定
+    if operation_type:
+        attributes.append(('error.operation_type', operation_type))
+        attributes.append(('operation_type', operation_type))
+    
+    # エラーカテゴリを設定
+    if error_category:
+        attributes.append(('error.category', error_category))
+    
+    # コンテキスト情報を設定
+    if context:
+        attributes.extend([
+            (f"error.context.{key}", value if type(value) in _SCALAR_TYPES else str(value)[:500])  # 長さ制限
+            for key, value in context.items()
+        ])
+    
+    # リクエスト情報を設定（利用可能な場合）
+    try:
+        if has_request_context():
+            req = request._get_current_object()
+            attributes.append(('error.request.method', req.method))
+            attributes.append(('error.request.url', req.url))
+            attributes.append(('error.request.remote_addr', req.remote_addr))
+            
+            # リクエストボディのサイズ
+            content_length = req.environ.get('CONTENT_LENGTH')
+            if content_length:
+                attributes.append(('error.request.content_length', int(content_length)))
+    except Exception:
+        pass  # リクエストコンテキストが利用できない場合は無視
+    
+    # スタックトレース情報を設定（制限付き）
+    # 報告対象の例外自身のトレースバックから、発生箇所に近いフレームのみを整形する
+    try:
+        if error.__traceback__ is not None:
+            stack_trace = ''.join(traceback.format_exception(
+                type(error), error, error.__traceback__, limit=-_STACK_TRACE_FRAME_LIMIT
+            ))
+            # スタックトレースを短縮（New Relicの制限を考慮）
+            short_trace = stack_trace[:1000] + '...' if len(stack_trace) > 1000 else stack_trace
+            attributes.append(('error.stack_trace', short_trace))
+    except Exception:
+        pass
+    
+    return attributes
+
+
 def report_error_to_newrelic(
     error: Exception, 
     user_id: Optional[Union[int, str]] = None, 
@@ -143,94 +249,59 @@ def report_error_to_newrelic(
         error_category (Optional[str]): エラーカテゴリ
     """
     try:
-        # 基本的なエラー情報をCustom Attributeとして設定
-        newrelic.agent.add_custom_attribute('error.type', type(error).__name__)
-        newrelic.agent.add_custom_attribute('error.message', str(error))
-        newrelic.agent.add_custom_attribute('error.timestamp', datetime.utcnow().isoformat())
-        newrelic.agent.add_custom_attribute('service_name', 'distributed-service')
-        
-        # ユーザーIDを設定
-        if user_id is not None:
-            user_id_str = str(user_id)
-            newrelic.agent.add_custom_attribute('error.user_id', user_id_str)
-            newrelic.agent.add_custom_attribute('user_id', user_id_str)
-            newrelic.agent.add_custom_attribute('enduser.id', user_id_str)
-        
-        # 操作タイプを設定
-        if operation_type:
-            newrelic.agent.add_custom_attribute('error.operation_type', operation_type)
-            newrelic.agent.add_custom_attribute('operation_type', operation_type)
-        
-        # エラーカテゴリを設定
-        if error_category:
-            newrelic.agent.add_custom_attribute('error.category', error_category)
-        
-        # コンテキスト情報を設定
-        if context:
-            for key, value in context.items():
-                try:
-                    attr_key = f"error.context.{key}"
-                    if isinstance(value, (str, int, float, bool)):
-                        newrelic.agent.add_custom_attribute(attr_key, value)
-                    else:
-                        newrelic.agent.add_custom_attribute(attr_key, str(value)[:500])  # 長さ制限
-                except Exception as attr_error:
-                    logger.warning(f"Failed to set error context attribute {key}: {attr_error}")
-        
-        # リクエスト情報を設定（利用可能な場合）
-        try:
-            if request:
-                newrelic.agent.add_custom_attribute('error.request.method', request.method)
-                newrelic.agent.add_custom_attribute('error.request.url', request.url)
-                newrelic.agent.add_custom_attribute('error.request.remote_addr', request.remote_addr)
-                
-                # リクエストボディのサイズ
-                content_length = request.headers.get('Content-Length')
-                if content_length:
-                    newrelic.agent.add_custom_attribute('error.request.content_length', int(content_length))
-        except Exception:
-            pass  # リクエストコンテキストが利用できない場合は無視
-        
-        # スタックトレース情報を設定（制限付き）
-        try:
-            stack_trace = traceback.format_exc()
-            if stack_trace and stack_trace != 'NoneType: None\n':
-                # スタックトレースを短縮（New Relicの制限を考慮）
-                short_trace = stack_trace[:1000] + '...' if len(stack_trace) > 1000 else stack_trace
-                newrelic.agent.add_custom_attribute('error.stack_trace', short_trace)
-        except Exception:
-            pass
+        # トランザクション外では属性を付与できないため、属性の作成（スタックトレースの整形を含む）を省略し、
+        # エラーの記録のみ行う（notice_errorはトランザクション外でもアプリケーションに記録される）
+        transaction = newrelic.agent.current_transaction()
+        if transaction is not None:
+            transaction.add_custom_attributes(
+                _build_error_attributes(error, user_id, operation_type, context, error_category)
+            )
         
         # エラーをNew Relicに記録
         newrelic.agent.notice_error()
         
         logger.info(
-            f"Error reported to New Relic - Type: {type(error).__name__}, "
-            f"User: {user_id}, Operation: {operation_type}, Category: {error_category}"
+            "Error reported to New Relic - Type: %s, User: %s, Operation: %s, Category: %s",
+            type(error).__name__, user_id, operation_type, error_category
         )
         
     except Exception as nr_error:
         logger.error(f"Failed to report error to New Relic: {nr_error}")
 
 
-def create_distributed_trace_headers():
+def inject_distributed_trace_headers(target: Dict[str, str]) -> Dict[str, str]:
     """
-    分散トレーシング用のヘッダーを作成
+    分散トレーシング用のヘッダーを呼び出し元の辞書へ直接書き込む
     
+    Args:
+        target (Dict[str, str]): 送信用HTTPヘッダーの辞書
+        
     Returns:
-        Dict[str, str]: 分散トレーシングヘッダー
+        Dict[str, str]: ヘッダーを書き込んだtarget
     """
     try:
-        headers = {}
-        newrelic.agent.insert_distributed_trace_headers(headers)
+        # エージェントは(ヘッダー名, 値)のリストに追記するため、リストで受け取ってから反映する
+        header_pairs = []
+        newrelic.agent.insert_distributed_trace_headers(header_pairs)
+        target.update(header_pairs)
         
-        # 作成されたヘッダーをログ出力（デバッグ用）
-        logger.debug(f"Distributed trace headers created: {list(headers.keys())}")
-        
-        return headers
+        # 作成されたヘッダーをログ出力（デバッグ用、DEBUG無効時はキー一覧を作成しない）
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Distributed trace headers created: %s", [name for name, _ in header_pairs])
     except Exception as e:
         logger.error(f"Failed to create distributed trace headers: {e}")
-        return {}
+    
+    return target
+
+
+def create_distributed_trace_headers():
+    """
+    分散トレーシング用のヘッダーを作成
+    
+    Returns:
+        Dict[str, str]: 分散トレーシングヘッダー
+    """
+    return inject_distributed_trace_headers({})
 
 
 def record_custom_event(
@@ -259,7 +330,7 @@ def record_custom_event(
         
         # 提供された属性を追加
         for key, value in attributes.items():
-            if isinstance(value, (str, int, float, bool)):
+            if type(value) in _SCALAR_TYPES:
                 event_attributes[key] = value
             else:
                 event_attributes[key] = str(value)
@@ -267,7 +338,7 @@ def record_custom_event(
         # カスタムイベントを記録
         newrelic.agent.record_custom_event(event_type, event_attributes)
         
-        logger.debug(f"Custom event recorded: {event_type}")
+        logger.debug("Custom event recorded: %s", event_type)
         
     except Exception as e:
         logger.error(f"Failed to record custom event: {e}")
@@ -283,15 +354,15 @@ def record_metric(name: str, value: Union[int, float], unit: Optional[str] = Non
         unit (Optional[str]): 単位
     """
     try:
-        # メトリクス名にサービス名を含める
-        metric_name = f"Custom/DistributedService/{name}"
-        
+        # メトリクス名にサービス名を含める（単位付きでも1回の文字列生成で済ませる）
         if unit:
-            metric_name += f"[{unit}]"
+            metric_name = f"Custom/DistributedService/{name}[{unit}]"
+        else:
+            metric_name = f"Custom/DistributedService/{name}"
         
         newrelic.agent.record_custom_metric(metric_name, value)
         
-        logger.debug(f"Custom metric recorded: {metric_name} = {value}")
+        logger.debug("Custom metric recorded: %s = %s", metric_name, value)
         
     except Exception as e:
         logger.error(f"Failed to record custom metric: {e}")
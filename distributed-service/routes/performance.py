@@ -10,6 +10,7 @@ from flask import Blueprint, request, jsonify
 from sqlalchemy import text
 import newrelic.agent
 
+from models import db, User, Product, Order, OrderItem
 from newrelic_utils import (
     set_user_custom_attribute,
     set_operation_custom_attribute,
@@ -23,24 +24,7 @@ logger = logging.getLogger(__name__)
 performance_bp = Blueprint('performance', __name__, url_prefix='/performance')
 
 def get_models_and_db():
-    """モデルクラスとデータベースインスタンスを取得"""
-    from flask import current_app
-    
-    # Flask-SQLAlchemyのdbインスタンスを取得
-    db = current_app.extensions['sqlalchemy']
-    
-    # グローバルスコープからモデルクラスを取得
-    import __main__
-    if hasattr(__main__, 'User'):
-        User = __main__.User
-        Product = __main__.Product
-        Order = __main__.Order
-        OrderItem = __main__.OrderItem
-    else:
-        # モデルクラスを動的に作成
-        from models import create_models
-        User, Product, Order, OrderItem, CartItem = create_models(db)
-    
+    """モデルクラスとデータベースインスタンスを取得（モデルはmodelsモジュールで一度だけ定義）"""
     return User, Product, Order, OrderItem, db
 
 def ensure_test_data(User, Product, Order, OrderItem, db):
@@ -6,11 +6,11 @@
 import os
 import sys
 import logging
-from app import app, db
-from models import create_models, check_database_connection, init_database
-
-# モデルクラスを作成
-User, Product, Order, OrderItem, CartItem = create_models(db)
+from app import app
+from models import (
+    db, User, Product, Order, OrderItem, CartItem,
+    check_database_connection, init_database
+)
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
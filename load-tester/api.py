@@ -1,10 +1,11 @@
 """
 API endpoints for Load Testing Automation
 """
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field, ValidationError
 from typing import Dict, Any, List, Optional
 import logging
+import zlib
 
 from config import config_manager
 from endpoint_selector import endpoint_selector
@@ -1288,10 +1289,66 @@ class UserImportRequest(BaseModel):
     source_system: str
     total_count: int
     metadata: Dict[str, Any] = {}
-
-@router.post("/users/import")
-async def import_users(request: UserImportRequest):
+    data_hash: Optional[str] = None
+
+# gzip展開後のインポートリクエストボディの上限（小さな圧縮データが無制限に膨らむのを防ぐ）
+MAX_IMPORT_BODY_BYTES = 256 * 1024 * 1024
+
+
+class ImportBodyTooLarge(Exception):
+    """展開後のインポートリクエストボディが上限を超えた"""
+
+
+def _decompress_gzip_body(body: bytes, max_size: int) -> bytes:
+    """
+    gzipボディを上限付きで展開
+    
+    Main Applicationはシャードごとのgzipメンバーを連結して送信するため、全メンバーを順に展開する
+    """
+    parts = []
+    total_size = 0
+    remaining = body
+    while remaining:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # 上限を1バイト超える分まで展開し、超過していれば打ち切る
+        part = decompressor.decompress(remaining, max_size - total_size + 1)
+        total_size += len(part)
+        if total_size > max_size:
+            raise ImportBodyTooLarge(f"Decompressed body exceeds {max_size} bytes")
+        if not decompressor.eof:
+            raise zlib.error("Truncated gzip body")
+        parts.append(part)
+        remaining = decompressor.unused_data
+    return b"".join(parts)
+
+
+@router.post(
+    "/users/import",
+    # ボディは手動で展開・検証するため、OpenAPIスキーマにリクエストモデルを明示
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": UserImportRequest.model_json_schema()}}
+        }
+    }
+)
+async def import_users(http_request: Request):
     """Main Applicationからのユーザーデータをインポート"""
+    # Main Applicationはgzip圧縮済みボディ (Content-Encoding: gzip) を送信する場合がある
+    body = await http_request.body()
+    if http_request.headers.get("content-encoding", "").lower() == "gzip":
+        try:
+            body = _decompress_gzip_body(body, MAX_IMPORT_BODY_BYTES)
+        except ImportBodyTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except zlib.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid gzip body: {str(e)}")
+    
+    try:
+        request = UserImportRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    
     try:
         from user_sync_api import UserSyncAPI
         
@@ -20,6 +20,9 @@ from config import config_manager
 
 logger = logging.getLogger(__name__)
 
+# 最後に取り込みに成功したMain Applicationのデータハッシュ（同期状況で公開）
+_last_imported_data_hash: Optional[str] = None
+
 # エラーハンドリング用のクラス（簡易版）
 class LoadTesterErrorHandler:
     """Load Tester用の簡易エラーハンドリング"""
@@ -548,6 +551,11 @@ class UserSyncAPI:
                 import_timestamp=start_time.isoformat()
             )
             
+            # Main Applicationが次回の同期前に照合できるようハッシュを記録
+            if import_result.success and user_data.get("data_hash"):
+                global _last_imported_data_hash
+                _last_imported_data_hash = user_data["data_hash"]
+            
             logger.info(f"ユーザーインポート完了: 成功={imported_count}件, 失敗={len(errors)}件")
             return import_result
         
@@ -638,6 +646,7 @@ class UserSyncAPI:
                 "total_users": len(test_users),
                 "users": users_info,
                 "session_stats": session_stats.to_dict(),
+                "data_hash": _last_imported_data_hash,
                 "last_sync_check": datetime.utcnow().isoformat()
             }
             
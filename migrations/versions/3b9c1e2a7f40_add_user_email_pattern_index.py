@@ -0,0 +1,35 @@
+"""Add text_pattern_ops index on users.email
+
+Revision ID: 3b9c1e2a7f40
+Revises: 6d7f4e573f01
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9c1e2a7f40'
+down_revision = '6d7f4e573f01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 前方一致LIKE（email LIKE 'prefix%'）でインデックスを使えるようにする
+    # PostgreSQLではロケール依存の照合順序だと通常のB-treeが使われないため text_pattern_ops を指定
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_pattern '
+            'ON users (email text_pattern_ops)'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_pattern')
@@ -218,6 +218,22 @@ def test_retry_config():
         assert delay_fixed2 == 2.0, f"固定遅延2が正しくありません: {delay_fixed2}"
         
         print("✅ 固定遅延計算: 成功")
+        
+        # ジッター付き設定
+        jitter_config = RetryConfig(
+            base_delay=1.0,
+            max_delay=10.0,
+            exponential_backoff=True,
+            jitter=0.5
+        )
+        
+        for _ in range(20):
+            delay_jitter = jitter_config.get_delay(2)
+            assert 4.0 <= delay_jitter <= 6.0, f"ジッター付き遅延が範囲外です: {delay_jitter}"
+        
+        assert jitter_config.get_delay(10) == 10.0, "ジッター付きでも最大遅延を超えてはいけません"
+        
+        print("✅ ジッター付き遅延計算: 成功")
         return True
         
     except Exception as e:
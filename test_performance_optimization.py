@@ -2,12 +2,15 @@
 パフォーマンス最適化機能のテスト
 タスク9: パフォーマンス最適化の実装のテスト
 """
+import gzip
+import json
 import unittest
 import time
 import tempfile
 import os
 from unittest.mock import patch, MagicMock
 from datetime import datetime
+from types import SimpleNamespace
 
 # テスト対象のインポート
 from app.services.bulk_user_creator import BulkUserCreator, UserCreationConfig
@@ -147,21 +150,42 @@ class TestUserSyncServiceOptimization(unittest.TestCase):
         
         print(f"データハッシュ計算テスト: {hash1[:16]}... -> {hash3[:16]}...")
     
-    def test_user_change_detection(self):
-        """ユーザー変更検出のテスト"""
+    def test_differential_change_detection(self):
+        """差分変更検出のテスト（追加・更新・削除）"""
         from app.services.user_sync_service import TestUserData
         
-        user1 = TestUserData(id=1, username="user1", email="user1@test.com", test_batch_id="batch1")
-        user2 = TestUserData(id=1, username="user1", email="user1@test.com", test_batch_id="batch1")
-        user3 = TestUserData(id=1, username="user1_changed", email="user1@test.com", test_batch_id="batch1")
-        
-        # 同じユーザーは変更なし
-        self.assertFalse(self.sync_service._user_has_changed(user1, user2))
-        
-        # ユーザー名が変わった場合は変更あり
-        self.assertTrue(self.sync_service._user_has_changed(user1, user3))
-        
-        print("ユーザー変更検出テスト: 正常に動作")
+        # 前回同期時の状態をキャッシュに設定
+        previous_rows = [
+            (1, "user1", "user1@test.com", "batch1"),
+            (2, "user2", "user2@test.com", "batch1"),
+            (3, "user3", "user3@test.com", "batch1")
+        ]
+        previous_state = self.sync_service._fingerprint_rows(previous_rows)
+        self.sync_service._sync_cache["last_users"] = previous_state
+        
+        # user1は変更なし、user2は更新、user3は削除、user4は追加
+        current_rows = [
+            (1, "user1", "user1@test.com", "batch1"),
+            (2, "user2_changed", "user2@test.com", "batch1"),
+            (4, "user4", "user4@test.com", "batch1")
+        ]
+        loaded_users = {
+            2: TestUserData(id=2, username="user2_changed", email="user2@test.com", test_batch_id="batch1"),
+            4: TestUserData(id=4, username="user4", email="user4@test.com", test_batch_id="batch1")
+        }
+        with patch.object(self.sync_service, '_get_users_by_ids', return_value=loaded_users) as mock_load:
+            changes = self.sync_service._calculate_differential_changes(current_rows)
+        
+        # 追加・更新されたユーザーのみDBから読み込む
+        mock_load.assert_called_once_with([4, 2])
+        self.assertEqual([user.id for user in changes.added_users], [4])
+        self.assertEqual([user.id for user in changes.updated_users], [2])
+        self.assertEqual(changes.deleted_user_ids, [3])
+        
+        # 比較元のキャッシュはインポート成功まで更新されない
+        self.assertIs(self.sync_service._sync_cache["last_users"], previous_state)
+        
+        print("差分変更検出テスト: 正常に動作")
     
     def test_compression_threshold(self):
         """圧縮閾値のテスト"""
@@ -182,6 +206,251 @@ class TestUserSyncServiceOptimization(unittest.TestCase):
         print("圧縮閾値テスト: 小さなデータは圧縮されない")
 
 
+class TestUserSyncStatePersistence(unittest.TestCase):
+    """UserSyncServiceの同期状態永続化のテスト"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.temp_dir.name, "sync_state.json")
+        env_patcher = patch.dict(os.environ, {"USER_SYNC_STATE_FILE": self.state_file})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        self.addCleanup(self.temp_dir.cleanup)
+        
+        self.users = [
+            SimpleNamespace(
+                id=i, username=f"user{i}", email=f"user{i}@test.com", is_test_user=True,
+                test_batch_id="batch1", created_by_bulk=True, created_at=None
+            )
+            for i in range(1, 4)
+        ]
+    
+    def _create_service(self, load_tester_hash=None):
+        """DBとLoad Testerへのアクセスをモックしたサービスを作成"""
+        from app.services.user_sync_service import TestUserData
+        
+        service = UserSyncService()
+        rows = [(user.id, user.username, user.email, user.test_batch_id) for user in self.users]
+        query = MagicMock()
+        query.order_by.return_value.yield_per.return_value = self.users
+        query.all.return_value = self.users
+        
+        for name, value in (
+            ("_build_filtered_query", query),
+            ("_get_filtered_user_rows", rows),
+            ("_get_users_by_ids", {
+                user.id: TestUserData.from_user(user, include_password=True) for user in self.users
+            }),
+            ("_fetch_load_tester_hash", load_tester_hash)
+        ):
+            patcher = patch.object(service, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return service
+    
+    def _sync(self, service, success=True):
+        """エクスポートしてLoad Testerへのインポートを実行"""
+        from app.services.user_sync_service import SyncResult
+        
+        export_data = service.export_users_from_app_optimized()
+        import_result = SyncResult(
+            success=success,
+            synced_count=export_data.total_count if success else 0,
+            failed_count=0 if success else export_data.total_count,
+            errors=[] if success else ["Load Testerインポート失敗"],
+            sync_timestamp=datetime.utcnow().isoformat(),
+            duration=0.0
+        )
+        with patch.object(service, '_post_import_request', return_value=import_result):
+            service.import_users_to_load_tester(export_data)
+        return export_data
+    
+    def _rows_hash(self, service):
+        return service._calculate_rows_hash(
+            (user.id, user.username, user.email, user.test_batch_id) for user in self.users
+        )
+    
+    def test_state_is_loaded_lazily(self):
+        """状態ファイルはエクスポート時まで読み込まない"""
+        self._sync(self._create_service())
+        
+        service = UserSyncService()
+        self.assertIsNone(service._last_sync_hash)
+        self.assertEqual(service._sync_cache, {})
+    
+    def test_state_survives_restart(self):
+        """インポート成功後の同期状態が再起動後も引き継がれる"""
+        self._sync(self._create_service())
+        
+        # 再起動後も差分同期となり、変更がなければ送信を省略
+        service = self._create_service()
+        export_data = service.export_users_from_app_optimized()
+        self.assertEqual(export_data.metadata["sync_type"], "no_changes")
+        self.assertEqual(set(service._sync_cache["last_users"]), {1, 2, 3})
+        
+        # 削除されたユーザーが差分として検出される
+        self.users.pop()
+        service = self._create_service()
+        export_data = service.export_users_from_app_optimized()
+        self.assertEqual(export_data.metadata["sync_type"], "differential")
+        self.assertEqual(export_data.metadata["deleted_user_ids"], [3])
+    
+    def test_failed_import_is_not_committed(self):
+        """インポート失敗時は同期状態を確定しない"""
+        self._sync(self._create_service(), success=False)
+        self.assertFalse(os.path.exists(self.state_file))
+        
+        # 次回もフル同期で全ユーザーを送信する
+        export_data = self._create_service().export_users_from_app_optimized()
+        self.assertNotIn("sync_type", export_data.metadata)
+        self.assertEqual(export_data.total_count, len(self.users))
+    
+    def test_cold_start_load_tester_hash_match(self):
+        """コールドスタート時にLoad Testerのハッシュが一致すれば転送を省略"""
+        service = self._create_service()
+        service._fetch_load_tester_hash.return_value = self._rows_hash(service)
+        
+        export_data = self._sync(service)
+        self.assertEqual(export_data.metadata["sync_type"], "no_changes")
+        self.assertEqual(export_data.users, [])
+        
+        # 比較元のユーザー指紋も保存され、次回は差分同期になる
+        service = self._create_service()
+        self.assertEqual(
+            service.export_users_from_app_optimized().metadata["sync_type"], "no_changes"
+        )
+        self.assertEqual(set(service._sync_cache["last_users"]), {1, 2, 3})
+    
+    def test_periodic_full_sync(self):
+        """変更なしの回も数え、一定回数ごとにフル同期を実行"""
+        service = self._create_service()
+        self._sync(service)
+        
+        for _ in range(service.full_sync_interval):
+            export_data = self._sync(service)
+            self.assertEqual(export_data.metadata["sync_type"], "no_changes")
+        
+        with patch.object(service, '_export_full_data', wraps=service._export_full_data) as mock_full:
+            self._sync(service)
+        mock_full.assert_called_once()
+        self.assertEqual(service._differential_sync_count, 0)
+
+
+class TestUserSyncFileImport(unittest.TestCase):
+    """UserSyncServiceのJSONファイルエクスポート・インポートのテスト"""
+    
+    def setUp(self):
+        from app.services.user_sync_service import UserExportData, TestUserData
+        
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        
+        self.sync_service = UserSyncService()
+        self.export_data = UserExportData(
+            users=[
+                TestUserData(id=i, username=f"user{i}", email=f"user{i}@test.com", test_batch_id="batch1")
+                for i in range(1, 6)
+            ],
+            export_timestamp=datetime.utcnow().isoformat(),
+            source_system="main_application",
+            total_count=5,
+            metadata={"clear_existing": True, "export_duration": 0.5}
+        )
+        patcher = patch.object(self.sync_service, 'export_users_from_app', return_value=self.export_data)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        # Load Testerへの送信内容を記録
+        self.requests = []
+        patcher = patch.object(self.sync_service, '_post_import_request', side_effect=self._record_request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def _record_request(self, request_body, request_headers, total_count, source_system):
+        from app.services.user_sync_service import SyncResult
+        
+        self.requests.append(json.loads(request_body))
+        return SyncResult(
+            success=True,
+            synced_count=total_count,
+            failed_count=0,
+            errors=[],
+            sync_timestamp=datetime.utcnow().isoformat(),
+            duration=0.0
+        )
+    
+    def _export(self, file_name):
+        file_path = os.path.join(self.temp_dir.name, file_name)
+        self.assertTrue(self.sync_service.export_to_json_file(file_path))
+        return file_path
+    
+    def test_gzip_export_import(self):
+        """.json.gzはgzip圧縮して出力し、インポート時に自動展開する"""
+        file_path = self._export("users.json.gz")
+        
+        with open(file_path, 'rb') as f:
+            self.assertEqual(f.read(2), b'\x1f\x8b')
+        with gzip.open(file_path, 'rb') as f:
+            file_data = json.load(f)
+        self.assertEqual([user["id"] for user in file_data["users"]], [1, 2, 3, 4, 5])
+        self.assertEqual(file_data["metadata"], self.export_data.metadata)
+        
+        result = self.sync_service.import_from_json_file(file_path)
+        self.assertTrue(result.success)
+        self.assertEqual(result.synced_count, 5)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(self.requests[0]["metadata"], self.export_data.metadata)
+    
+    def test_streaming_import(self):
+        """逐次インポートはチャンク単位で送信し、metadataも引き継ぐ"""
+        from app.services import user_sync_service
+        if user_sync_service.ijson is None:
+            self.skipTest("ijsonが未導入")
+        
+        self.sync_service.streaming_import_threshold = 0
+        self.sync_service.import_chunk_size = 2
+        
+        for file_name in ("users.json", "users.json.gz"):
+            with self.subTest(file_name=file_name):
+                self.requests.clear()
+                result = self.sync_service.import_from_json_file(self._export(file_name))
+                
+                self.assertTrue(result.success)
+                self.assertEqual(result.synced_count, 5)
+                self.assertEqual(
+                    [[user["id"] for user in body["users"]] for body in self.requests],
+                    [[1, 2], [3, 4], [5]]
+                )
+                for body in self.requests:
+                    self.assertEqual(body["source_system"], "main_application")
+                    self.assertEqual(body["export_timestamp"], self.export_data.export_timestamp)
+                    self.assertEqual(body["metadata"]["export_duration"], 0.5)
+                
+                # 既存ユーザーのクリアは最初のチャンクのみ
+                self.assertEqual(
+                    [body["metadata"]["clear_existing"] for body in self.requests],
+                    [True, False, False]
+                )
+    
+    def test_streaming_import_users_first_file(self):
+        """usersが先頭にある旧形式のファイルも逐次インポートできる"""
+        from app.services import user_sync_service
+        if user_sync_service.ijson is None:
+            self.skipTest("ijsonが未導入")
+        
+        self.sync_service.streaming_import_threshold = 0
+        self.sync_service.import_chunk_size = 2
+        
+        file_path = os.path.join(self.temp_dir.name, "legacy.json")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.export_data.to_dict(), f)
+        
+        result = self.sync_service.import_from_json_file(file_path)
+        self.assertTrue(result.success)
+        self.assertEqual(result.synced_count, 5)
+        self.assertEqual(len(self.requests), 3)
+
+
 class TestPerformanceUtils(unittest.TestCase):
     """パフォーマンスユーティリティのテスト"""
     
@@ -324,6 +593,12 @@ def run_performance_tests():
     # UserSyncService最適化テスト
     test_suite.addTests(loader.loadTestsFromTestCase(TestUserSyncServiceOptimization))
     
+    # 同期状態永続化テスト
+    test_suite.addTests(loader.loadTestsFromTestCase(TestUserSyncStatePersistence))
+    
+    # JSONファイルエクスポート・インポートテスト
+    test_suite.addTests(loader.loadTestsFromTestCase(TestUserSyncFileImport))
+    
     # パフォーマンスユーティリティテスト
     test_suite.addTests(loader.loadTestsFromTestCase(TestPerformanceUtils))
     
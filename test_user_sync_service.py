@@ -173,7 +173,8 @@ def test_user_sync_service_import(mock_requests):
             "imported_count": 2,
             "errors": []
         }
-        mock_requests.post.return_value = mock_response
+        mock_session = mock_requests.Session.return_value
+        mock_session.post.return_value = mock_response
         
         # テストデータ作成
         test_users = [
@@ -210,8 +211,8 @@ def test_user_sync_service_import(mock_requests):
         assert len(sync_result.errors) == 0, f"エラーが発生しました: {sync_result.errors}"
         
         # HTTPリクエストが正しく呼ばれたかチェック
-        mock_requests.post.assert_called_once()
-        call_args = mock_requests.post.call_args
+        mock_session.post.assert_called_once()
+        call_args = mock_session.post.call_args
         assert "http://test-load-tester:8080/api/users/import" in call_args[0], "正しいURLが呼ばれていません"
         
         print("✅ UserSyncServiceインポート: 成功")
@@ -232,7 +233,7 @@ def test_user_sync_service_import_error_handling(mock_requests):
         import requests
         
         # エラーレスポンス設定
-        mock_requests.post.side_effect = requests.exceptions.ConnectionError("接続エラー")
+        mock_requests.Session.return_value.post.side_effect = requests.exceptions.ConnectionError("接続エラー")
         
         # テストデータ作成
         test_users = [
@@ -316,7 +317,7 @@ def test_user_sync_service_json_file_operations():
                 print("✅ JSONファイルエクスポート: 成功")
                 
                 # JSONファイルインポートテスト（モック使用）
-                with patch('app.services.user_sync_service.requests') as mock_requests:
+                with patch.object(sync_service, 'session') as mock_session:
                     mock_response = Mock()
                     mock_response.status_code = 200
                     mock_response.json.return_value = {
@@ -324,7 +325,7 @@ def test_user_sync_service_json_file_operations():
                         "imported_count": 1,
                         "errors": []
                     }
-                    mock_requests.post.return_value = mock_response
+                    mock_session.post.return_value = mock_response
                     
                     import_result = sync_service.import_from_json_file(temp_file)
                     assert import_result.success == True, "JSONファイルインポートが失敗しました"
@@ -354,13 +355,11 @@ def test_user_sync_service_validation(mock_requests, mock_user):
     try:
         from app.services.user_sync_service import UserSyncService
         
-        # Main Appモックユーザー設定
-        mock_user_obj = Mock()
-        mock_user_obj.username = "testuser@example.com"
-        
+        # Main Appモックユーザー設定（username, test_batch_id の射影行）
         mock_query = Mock()
+        mock_query.with_entities.return_value = mock_query
         mock_query.filter.return_value = mock_query
-        mock_query.all.return_value = [mock_user_obj]
+        mock_query.all.return_value = [("testuser@example.com", None)]
         mock_user.query = mock_query
         
         # Load Testerレスポンス設定
@@ -371,7 +370,7 @@ def test_user_sync_service_validation(mock_requests, mock_user):
                 {"username": "testuser@example.com"}
             ]
         }
-        mock_requests.get.return_value = mock_response
+        mock_requests.Session.return_value.get.return_value = mock_response
         
         sync_service = UserSyncService("http://test-load-tester:8080")
         